@@ -1,21 +1,29 @@
 #!/usr/bin/env python3
 """
 Accelerated decay test - forces decay to happen more frequently
+
+Runs on a virtual clock: each cycle ages the memories by a week without
+waiting for one.
 """
 
 import os
-import time
 from memory_utils import (
     store_memory_block, 
     load_random_memories, 
     simulate_memory_decay, 
-    age_memories_over_time
+    age_memories_over_time,
+    use_clock
 )
+from sim_clock import VirtualClock
+
+DAYS_PER_CYCLE = 7
 
 def accelerated_decay_test():
     """Test decay with higher frequency"""
     print("🚀 ACCELERATED DECAY TEST")
     print("="*50)
+    clock = VirtualClock()
+    use_clock(clock)
     
     # Create some test memories first
     test_memories = [
@@ -29,14 +37,15 @@ def accelerated_decay_test():
     print("💾 Creating test memories...")
     for memory in test_memories:
         store_memory_block(memory)
-        time.sleep(0.2)
+        clock.advance(60)
     
     print("\n💾 Initial memories loaded:")
     print(load_random_memories(5))
     
     print("\n🔄 Running accelerated decay cycles...")
     for i in range(1, 6):
-        print(f"\n--- Cycle {i} ---")
+        clock.advance_days(DAYS_PER_CYCLE)
+        print(f"\n--- Cycle {i} (day {i * DAYS_PER_CYCLE}) ---")
         
         # Force decay simulation
         simulate_memory_decay()
@@ -48,8 +57,6 @@ def accelerated_decay_test():
         print("-" * 30)
         print(current_memories[:150] + "..." if len(current_memories) > 150 else current_memories)
         print("-" * 30)
-        
-        time.sleep(0.5)
     
     print("\n✅ Accelerated decay test complete!")
 
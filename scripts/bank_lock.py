@@ -0,0 +1,88 @@
+"""
+Read/write coordination for the memory bank
+
+Many readers (context loading) may hold the lock at once; a writer (store,
+eviction, decay write-back) gets it exclusively. Waiting writers block new
+readers so a steady stream of turns can't starve decay. Both sides are
+reentrant: a thread already reading may read again even with a writer
+waiting, and a thread holding the write side may also take the read side.
+"""
+
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None          # Thread ident holding the write side
+        self._writer_depth = 0
+        self._writers_waiting = 0
+        self._local = threading.local()  # This thread's read depth
+
+    def acquire_read(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1  # Nested read inside our own write
+                return
+            depth = getattr(self._local, "depth", 0)
+            if depth:
+                self._local.depth = depth + 1  # Waiting for the writer would deadlock
+                return
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+            self._local.depth = 1
+
+    def release_read(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth -= 1
+                return
+            self._local.depth -= 1
+            if self._local.depth:
+                return
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self):
+        with self._cond:
+            self._writer_depth -= 1
+            if self._writer_depth == 0:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Compression benchmark - raw vs compressed memory store/load throughput
+
+Usage: python benchmark_compression.py [--memories N] [--source DIR]
+
+Writes the same set of memories through DirectoryStorage in a scratch
+directory once per encoding, then reads them all back, and reports
+throughput and how many such memories would fit on a 1.44 MB floppy.
+Memories come from an existing memory_bank/ when given, otherwise
+synthetic conversation turns are generated.
+"""
+
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from memory_codec import MemoryCodec
+from memory_storage import DirectoryStorage
+from synthetic_turns import conversation
+
+FLOPPY_BYTES = 1474560
+
+
+def synthetic_memories(count, seed=0):
+    """Conversation turns in the shape store_memory_block writes"""
+    rng = random.Random(seed)
+    return [conversation(rng, i) for i in range(count)]
+
+
+def bank_memories(source):
+    storage = DirectoryStorage(source)
+    return [storage.read(name).decode("utf-8", errors="ignore") for name, _, _ in storage.scan()]
+
+
+def run_case(label, codec, memories):
+    """Store then load every memory; returns a result dict"""
+    directory = tempfile.mkdtemp(prefix="dd_bench_")
+    try:
+        storage = DirectoryStorage(directory)
+        payloads = [m.encode("utf-8") for m in memories]
+        names = [f"mem_{i:08d}.txt" for i in range(len(payloads))]
+
+        start = time.perf_counter()
+        stored_bytes = 0
+        for name, data in zip(names, payloads):
+            stored = codec.encode(data)
+            storage.write(name, stored)
+            stored_bytes += len(stored)
+        store_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for name, data in zip(names, payloads):
+            if codec.decode(storage.read(name)) != data:
+                raise RuntimeError(f"{label}: {name} did not round-trip")
+        load_time = time.perf_counter() - start
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    plain_bytes = sum(len(p) for p in payloads)
+    return {
+        "label": label,
+        "store_per_sec": len(payloads) / store_time,
+        "load_per_sec": len(payloads) / load_time,
+        "ratio": stored_bytes / plain_bytes,
+        "fit": int(FLOPPY_BYTES / (stored_bytes / len(payloads))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare raw and compressed memory storage")
+    parser.add_argument("--memories", type=int, default=2000, help="synthetic memories to generate")
+    parser.add_argument("--source", default=None, help="benchmark an existing memory bank instead")
+    args = parser.parse_args()
+
+    memories = bank_memories(args.source) if args.source else synthetic_memories(args.memories)
+    if not memories:
+        print("💾 No memories to benchmark")
+        return 1
+
+    dict_dir = tempfile.mkdtemp(prefix="dd_zdict_")
+    try:
+        trained = MemoryCodec("zlib", dict_dir)
+        trained.train(memories[:200])
+        cases = [
+            ("raw", MemoryCodec("none")),
+            ("zlib", MemoryCodec("zlib")),
+            ("zlib+dict", trained),
+            ("lzma", MemoryCodec("lzma")),
+        ]
+        print(f"💾 {len(memories)} memories, "
+              f"{sum(len(m.encode('utf-8')) for m in memories) / len(memories):.0f} bytes each on average")
+        print(f"{'encoding':<10} {'store/s':>10} {'load/s':>10} {'size':>7} {'fit on floppy':>14}")
+        for label, codec in cases:
+            r = run_case(label, codec, memories)
+            print(f"{r['label']:<10} {r['store_per_sec']:>10.0f} {r['load_per_sec']:>10.0f} "
+                  f"{r['ratio']:>6.0%} {r['fit']:>14}")
+    finally:
+        shutil.rmtree(dict_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
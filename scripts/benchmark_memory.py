@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Memory layer benchmark - store, load, eviction and decay on synthetic banks
+
+Usage: python benchmark_memory.py [--sizes 100,10000,1000000] [--ops 200]
+                                  [--output FILE] [--baseline FILE]
+
+For each bank size a fresh bank of synthetic memories is generated in a
+scratch directory and a child process times the memory_utils hot paths on
+it: store_memory_block, load_memories_with_priority, evict_oldest_memories,
+simulate_memory_decay and age_memories_over_time. Each operation gets
+latency percentiles and, where the kernel reports them (/proc/self/io),
+read/write syscalls and bytes per call. Opening the bank (index scan and
+manifest reconcile) is timed once.
+
+Importing memory_utils is timed too, in fresh interpreters against an
+empty scratch directory: it has to stay under IMPORT_TARGET_MS and must
+not create any file (the bank is opened on first use, not on import).
+
+Results are written as JSON. Given --baseline, they are compared with an
+earlier run and any p50 that got slower by more than --tolerance is
+reported as a regression (exit status 1).
+
+Banks of up to 10k memories use the directory store the installation runs
+on; bigger ones default to the segment store, since a million files is a
+benchmark of the file system rather than of this code.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from load_harness import percentile
+from synthetic_turns import conversation
+
+DEFAULT_SIZES = [100, 10_000, 1_000_000]
+DIRECTORY_MAX = 10_000      # Largest bank generated as one file per memory by default
+BANK_SPAN_DAYS = 90         # Synthetic memories are spread over this many days
+DECAY_RUNS = 5
+IMPORT_RUNS = 5
+IMPORT_TARGET_MS = 75       # Median cold `import memory_utils`, so tools and the REPL start fast
+
+OUTPUT_DIR = os.path.join(os.path.dirname(__file__), '../logs/benchmarks')
+
+
+# ============================================================================
+# MEASUREMENT
+# ============================================================================
+
+def read_proc_io():
+    """(syscalls, bytes) read and written so far by this process, or None"""
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(":") for line in f.read().splitlines())
+    except (OSError, ValueError):
+        return None
+    return {key: int(fields[key]) for key in ("syscr", "syscw", "rchar", "wchar")}
+
+
+class OpTimer:
+    """Collects per-call latency and I/O counters of one operation"""
+
+    def __init__(self):
+        self.latencies = []
+        self.io = {"syscr": 0, "syscw": 0, "rchar": 0, "wchar": 0}
+        self.io_available = True
+        # What reading /proc/self/io costs itself, taken off every measurement
+        first, second = read_proc_io(), read_proc_io()
+        self._overhead = {key: second[key] - first[key] for key in self.io} if first and second else None
+
+    def time(self, fn, *args):
+        before = read_proc_io()
+        start = time.perf_counter()
+        result = fn(*args)
+        self.latencies.append(time.perf_counter() - start)
+        after = read_proc_io()
+        if before is None or after is None or self._overhead is None:
+            self.io_available = False
+        else:
+            for key in self.io:
+                self.io[key] += after[key] - before[key] - self._overhead[key]
+        return result
+
+    def summary(self):
+        calls = len(self.latencies)
+        result = {
+            "calls": calls,
+            "mean_ms": sum(self.latencies) / calls * 1000 if calls else 0.0,
+            "p50_ms": percentile(self.latencies, 50) * 1000,
+            "p90_ms": percentile(self.latencies, 90) * 1000,
+            "p99_ms": percentile(self.latencies, 99) * 1000,
+            "max_ms": max(self.latencies) * 1000 if calls else 0.0,
+        }
+        if self.io_available and calls:
+            result.update({
+                "read_syscalls_per_call": self.io["syscr"] / calls,
+                "write_syscalls_per_call": self.io["syscw"] / calls,
+                "read_bytes_per_call": self.io["rchar"] / calls,
+                "write_bytes_per_call": self.io["wchar"] / calls,
+            })
+        return {key: round(value, 4) if isinstance(value, float) else value for key, value in result.items()}
+
+
+# ============================================================================
+# ONE BANK (RUN IN A CHILD PROCESS)
+# ============================================================================
+
+def generate_bank(mu, size, seed):
+    """Write `size` regular memories straight to storage, spread over BANK_SPAN_DAYS"""
+    rng = random.Random(seed)
+    storage = mu.get_storage()
+    now = time.time()
+    step = BANK_SPAN_DAYS * 24 * 3600 / max(size, 1)
+    for i in range(size):
+        stamp = datetime.fromtimestamp(now - (size - i) * step)
+        storage.write(f"mem_{stamp.strftime('%Y%m%d_%H%M%S_%f')}.txt", conversation(rng, i).encode("utf-8"))
+    # Drop whatever was derived before the bank was filled
+    mu.use_storage(storage)
+
+
+def run_bank(size, ops, seed):
+    """Benchmark one bank; memory_utils is configured through the environment"""
+    import memory_utils as mu
+
+    started = time.perf_counter()
+    generate_bank(mu, size, seed)
+    generated = time.perf_counter() - started
+
+    results = {}
+    timer = OpTimer()
+    timer.time(lambda: (mu.get_memory_index(), mu.get_manifest()))
+    results["open_bank"] = timer.summary()
+
+    mu.set_decay_seed(seed)
+    mu.set_context_seed(seed)
+    random.seed(seed)
+    rng = random.Random(seed)
+
+    timer = OpTimer()
+    for _ in range(ops):
+        timer.time(mu.load_memories_with_priority)
+    results["load_memories_with_priority"] = timer.summary()
+
+    timer = OpTimer()
+    for i in range(ops):
+        timer.time(mu.store_memory_block, conversation(rng, size + i))
+    results["store_memory_block"] = timer.summary()
+
+    timer = OpTimer()
+    for _ in range(min(ops, size)):
+        timer.time(mu.evict_oldest_memories, 1)
+    results["evict_oldest_memories"] = timer.summary()
+
+    timer = OpTimer()
+    for _ in range(DECAY_RUNS):
+        timer.time(mu.simulate_memory_decay)
+    results["simulate_memory_decay"] = timer.summary()
+
+    timer = OpTimer()
+    for _ in range(DECAY_RUNS):
+        timer.time(mu.age_memories_over_time)
+    results["age_memories_over_time"] = timer.summary()
+
+    return {"size": size, "storage": mu.STORAGE_BACKEND, "generate_s": round(generated, 3), "ops": results}
+
+
+def run_child(size, storage, ops, seed):
+    """Run one bank in a fresh interpreter with its own scratch memory dir"""
+    scratch = tempfile.mkdtemp(prefix=f"dd_bench_{size}_")
+    env = dict(os.environ,
+               DIGITAL_DECAY_MEMORY_DIR=scratch,
+               DIGITAL_DECAY_STORAGE=storage,
+               DIGITAL_DECAY_QUIET="1",
+               DIGITAL_DECAY_QUOTA_BYTES=str(1 << 40))  # Eviction is timed on its own, not forced
+    try:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", str(size), "--storage", storage,
+             "--ops", str(ops), "--seed", str(seed)],
+            env=env, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"bank of {size} failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def measure_import(runs=IMPORT_RUNS):
+    """Time a cold `import memory_utils` in fresh interpreters
+
+    Returns latency percentiles plus `files_created`, what the imports left
+    behind in their (initially empty) memory directory.
+    """
+    scratch = tempfile.mkdtemp(prefix="dd_bench_import_")
+    bank = os.path.join(scratch, "bank")
+    env = dict(os.environ, DIGITAL_DECAY_MEMORY_DIR=bank, DIGITAL_DECAY_QUIET="1")
+    code = "import time; t = time.perf_counter(); import memory_utils; print(time.perf_counter() - t)"
+    latencies = []
+    try:
+        for _ in range(runs):
+            proc = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__)))
+            if proc.returncode != 0:
+                raise RuntimeError(f"import failed:\n{proc.stderr}")
+            latencies.append(float(proc.stdout.strip().splitlines()[-1]))
+        created = sum(len(files) + len(dirs) for _, dirs, files in os.walk(scratch))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return {
+        "runs": runs,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 4),
+        "max_ms": round(max(latencies) * 1000, 4),
+        "target_ms": IMPORT_TARGET_MS,
+        "files_created": created,
+    }
+
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def print_bank(bank):
+    print(f"\n💾 Bank of {bank['size']:,} memories ({bank['storage']}, generated in {bank['generate_s']:.1f}s)")
+    print(f"{'operation':<30} {'calls':>6} {'p50 ms':>9} {'p99 ms':>9} {'rd/call':>8} {'wr/call':>8}")
+    for name, op in bank["ops"].items():
+        reads = op.get("read_syscalls_per_call")
+        writes = op.get("write_syscalls_per_call")
+        print(f"{name:<30} {op['calls']:>6} {op['p50_ms']:>9.3f} {op['p99_ms']:>9.3f} "
+              f"{reads if reads is not None else '-':>8} {writes if writes is not None else '-':>8}")
+
+
+def print_import(result):
+    status = "ok" if result["p50_ms"] <= result["target_ms"] and not result["files_created"] else "FAIL"
+    print(f"💾 import memory_utils: p50 {result['p50_ms']:.1f} ms (target {result['target_ms']} ms), "
+          f"{result['files_created']} files created  {status}")
+    return status == "ok"
+
+
+def compare(current, baseline, tolerance, min_delta_ms):
+    """Print p50 changes against a baseline; returns the regressions found
+
+    A change counts as a regression only if it exceeds both the tolerance
+    ratio and min_delta_ms, so noise on microsecond operations doesn't.
+    """
+    regressions = []
+    print(f"\n💾 Compared with baseline from {baseline['meta']['time']} (tolerance x{tolerance:g})")
+    for size, bank in current["banks"].items():
+        old_bank = baseline["banks"].get(size)
+        if old_bank is None:
+            continue
+        for name, op in bank["ops"].items():
+            old = old_bank["ops"].get(name)
+            if old is None or not old["p50_ms"]:
+                continue
+            ratio = op["p50_ms"] / old["p50_ms"]
+            slower = ratio > tolerance and op["p50_ms"] - old["p50_ms"] > min_delta_ms
+            flag = "REGRESSION" if slower else ""
+            print(f"{size:>9} {name:<30} {old['p50_ms']:>9.3f} -> {op['p50_ms']:>9.3f} ms  x{ratio:.2f} {flag}")
+            if flag:
+                regressions.append((size, name, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark memory_utils on synthetic banks")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="comma-separated bank sizes")
+    parser.add_argument("--ops", type=int, default=200, help="calls per store/load/evict benchmark")
+    parser.add_argument("--storage", default=None,
+                        help=f"storage backend (default: directory up to {DIRECTORY_MAX:,} memories, then segment)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="where to write the JSON results")
+    parser.add_argument("--baseline", default=None, help="earlier results to compare with")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="p50 slowdown counted as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="smallest p50 increase that can count")
+    parser.add_argument("--child", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(run_bank(args.child, args.ops, args.seed)))
+        return 0
+
+    results = {
+        "meta": {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "ops": args.ops,
+            "seed": args.seed,
+        },
+        "banks": {},
+    }
+    results["import"] = measure_import()
+    import_ok = print_import(results["import"])
+    for size in (int(s) for s in args.sizes.split(",")):
+        storage = args.storage or ("directory" if size <= DIRECTORY_MAX else "segment")
+        bank = run_child(size, storage, args.ops, args.seed)
+        results["banks"][str(size)] = bank
+        print_bank(bank)
+
+    output = args.output or os.path.join(OUTPUT_DIR, f"memory-{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance, args.min_delta_ms):
+            return 1
+    return 0 if import_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Byte-bounded LRU cache of memory contents
+
+Saves context loading from re-reading the same memories from storage every
+turn. Entries are keyed by memory name and can carry a validation stamp
+(mtime and size on the directory backend): a lookup with a different stamp
+is a miss, so edits made behind the program's back are picked up. Changes
+made through memory_utils (store, decay, eviction) invalidate entries
+explicitly, which is all the segment and FAT12 backends rely on.
+
+Pinned entries (the core memories, which never decay) don't count towards
+the byte bound and are never evicted.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class ContentCache:
+    """LRU map of memory name -> content bytes, bounded by total size"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # name -> (data, stamp), oldest first
+        self._pinned = set()
+        self._bytes = 0                 # Unpinned bytes only
+        self._pinned_bytes = 0
+        self._lock = threading.Lock()   # Readers share the bank lock, so guard our own state
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def get(self, name, stamp=None):
+        """Cached content, or None if absent or `stamp` doesn't match"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry[1] != stamp:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(name)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, name, data, stamp=None):
+        """Cache content just read from storage"""
+        with self._lock:
+            self._drop(name)
+            if name not in self._pinned and len(data) > self.max_bytes:
+                return  # Would evict everything else for one memory
+            self._entries[name] = (data, stamp)
+            if name in self._pinned:
+                self._pinned_bytes += len(data)
+            else:
+                self._bytes += len(data)
+                self._shrink()
+
+    def pin(self, name, data=None, stamp=None):
+        """Keep a memory cached for good (optionally storing its content now)"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if name not in self._pinned and entry is not None:
+                self._bytes -= len(entry[0])
+                self._pinned_bytes += len(entry[0])
+            self._pinned.add(name)
+        if data is not None:
+            self.put(name, data, stamp)
+
+    def invalidate(self, name):
+        """Drop a memory's content after it changed or was deleted (pins survive)"""
+        with self._lock:
+            self._drop(name)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pinned.clear()
+            self._bytes = self._pinned_bytes = 0
+
+    def stats(self):
+        """Hit/miss counters and current footprint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "pinned": len(self._pinned),
+                "bytes": self._bytes,
+                "pinned_bytes": self._pinned_bytes,
+            }
+
+    def _drop(self, name):
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return
+        if name in self._pinned:
+            self._pinned_bytes -= len(entry[0])
+        else:
+            self._bytes -= len(entry[0])
+
+    def _shrink(self):
+        """Evict least recently used unpinned entries until under the bound"""
+        while self._bytes > self.max_bytes:
+            name = next(iter(self._entries))
+            if name in self._pinned:
+                self._entries.move_to_end(name)  # Out of the way of the LRU end
+                continue
+            self._drop(name)
+            self.evictions += 1
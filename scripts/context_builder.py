@@ -0,0 +1,175 @@
+"""
+Token-budgeted prompt assembly
+
+Every prompt starts with the same core-identity prefix: all core memories,
+in name order, byte-for-byte identical from turn to turn. Model servers
+that keep the evaluated prompt around (ollama's KV cache) can then skip
+re-evaluating that prefix and only process what changed. After the prefix
+come as many memory fragments as fit in the token budget, then the user's
+turn.
+
+Token counts are estimates (about four characters per token for English
+text) since the model's tokenizer isn't available here; the budget leaves
+headroom for that.
+
+ContextPrefetcher loads the next turn's context in the background while
+the REPL waits for input, so the disk reads are off the turn's critical
+path.
+"""
+
+import threading
+from dataclasses import dataclass
+
+import memory_utils
+
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 2048
+PREFIX_SHARE = 0.5          # Most of the budget the core prefix may take
+MAX_CONTEXT_MEMORIES = 16   # Never ask the bank for more fragments than this
+
+
+def estimate_tokens(text):
+    """Rough token count of a piece of text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class PromptPlan:
+    """An assembled prompt and how its token budget was spent"""
+    prompt: str
+    prefix_tokens: int = 0      # Stable core prefix, reusable across turns
+    memory_tokens: int = 0      # Memory fragments chosen for this turn
+    turn_tokens: int = 0        # The user's turn
+    memories: int = 0           # Fragments that fit
+    dropped: int = 0            # Fragments that didn't
+    budget: int = 0
+    prefetched: bool = False    # Fragments were loaded before the turn started
+
+    @property
+    def total_tokens(self):
+        return self.prefix_tokens + self.memory_tokens + self.turn_tokens
+
+    def to_dict(self):
+        return {
+            "prompt_tokens_est": self.total_tokens,
+            "prefix_tokens_est": self.prefix_tokens,
+            "memories": self.memories,
+            "prefetched": self.prefetched,
+        }
+
+
+def assemble_prompt(core_memories, fragments, user_input, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Lay out prefix, fragments and user turn within the budget
+
+    Pure function of its inputs: the same core memories always give the
+    same prefix. Core memories are kept in the given order and cut at a
+    whole memory once they reach PREFIX_SHARE of the budget; fragments are
+    added in order while they fit.
+    """
+    turn = f"User: {user_input}\nAI:"
+    plan = PromptPlan(prompt="", turn_tokens=estimate_tokens(turn) + 1, budget=token_budget)
+
+    prefix_lines = []
+    prefix_limit = int(token_budget * PREFIX_SHARE)
+    for memory in core_memories:
+        cost = estimate_tokens(memory) + 1  # Plus the newline
+        if plan.prefix_tokens + cost > prefix_limit:
+            break
+        prefix_lines.append(memory)
+        plan.prefix_tokens += cost
+
+    room = token_budget - plan.prefix_tokens - plan.turn_tokens
+    memory_lines = []
+    for fragment in fragments:
+        cost = estimate_tokens(fragment) + 1
+        if plan.memory_tokens + cost > room:
+            plan.dropped += 1
+            continue
+        memory_lines.append(fragment)
+        plan.memory_tokens += cost
+    plan.memories = len(memory_lines)
+
+    plan.prompt = "".join(line + "\n" for line in prefix_lines + memory_lines) + turn
+    return plan
+
+
+def _fragments_wanted(core, user_input, token_budget):
+    """How many fragments to ask the bank for"""
+    prefix_tokens = sum(estimate_tokens(m) + 1 for m in core)
+    room = token_budget - min(prefix_tokens, int(token_budget * PREFIX_SHARE)) - estimate_tokens(user_input)
+
+    # About as many as the remaining room holds, judging by the average
+    # stored memory, plus a couple in case some are short
+    index = memory_utils.get_memory_index()
+    count = index.count('regular')
+    if not count:
+        return 0
+    per_memory = index.bytes_used('regular') / count / CHARS_PER_TOKEN + 1
+    return min(int(room / per_memory) + 2, MAX_CONTEXT_MEMORIES)
+
+
+def build_context(user_input, token_budget=DEFAULT_TOKEN_BUDGET, query=None):
+    """Assemble this turn's prompt from the memory bank"""
+    core = memory_utils.get_core_memories()
+    fragments = memory_utils.load_memory_fragments(_fragments_wanted(core, user_input, token_budget), query=query)
+    return assemble_prompt(core, fragments, user_input, token_budget)
+
+
+class ContextPrefetcher:
+    """Loads the next turn's context on a worker thread between turns
+
+    Call start() once a turn is done and take(user_input) when the next one
+    begins. In random retrieval mode the fragments don't depend on what the
+    user types, so the whole selection is read ahead; in relevance mode the
+    retrieval index, manifest and core prefix are warmed and the query-
+    dependent part is left to take(). A prefetched selection is thrown away
+    if the bank changed (a store, decay or eviction) since it was read.
+    """
+
+    def __init__(self, token_budget=DEFAULT_TOKEN_BUDGET):
+        self.token_budget = token_budget
+        self.hits = 0           # Turns served from a prefetched selection
+        self.stale = 0          # Prefetched selections dropped because the bank changed
+        self._thread = None
+        self._result = None     # (generation, core, fragments) or None
+
+    def start(self):
+        """Begin loading in the background (no-op if a load is running)"""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._result = None
+        self._thread = threading.Thread(target=self._run, name="context-prefetch", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            generation = memory_utils.bank_generation()
+            core = memory_utils.get_core_memories()
+            if memory_utils.RETRIEVAL_MODE == 'relevance':
+                memory_utils.get_retrieval_index()
+                memory_utils.get_manifest()
+                return
+            fragments = memory_utils.load_memory_fragments(
+                _fragments_wanted(core, "", self.token_budget), mode='random', quiet=True)
+            self._result = (generation, core, fragments)
+        except Exception as e:
+            # The turn loads its context itself; just say why this one didn't help
+            print(f"💾 Context prefetch failed: {e} 💾")
+
+    def take(self, user_input, query=None):
+        """This turn's PromptPlan, from the prefetched selection when still current"""
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        result, self._result = self._result, None
+        if result is not None:
+            generation, core, fragments = result
+            if generation == memory_utils.bank_generation():
+                self.hits += 1
+                memory_utils.simulate_floppy_sounds('read')
+                plan = assemble_prompt(core, fragments, user_input, self.token_budget)
+                plan.prefetched = True
+                return plan
+            self.stale += 1
+        return build_context(user_input, self.token_budget, query=query)
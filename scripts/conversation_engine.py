@@ -0,0 +1,152 @@
+"""
+Conversation engine - one Digital Decay turn as a callable step
+
+The turn pipeline the REPL runs, without the REPL: count the turn for the
+decay scheduler, assemble the context, call the model, log the exchange
+and store it as a new memory. run_llm.py drives it from the keyboard and
+load_harness.py from scripted transcripts.
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+import metrics
+from context_builder import DEFAULT_TOKEN_BUDGET, ContextPrefetcher, PromptPlan
+from conversation_log import ConversationLog
+from decay_scheduler import DecayScheduler
+from llm_backends import TurnStats, generate
+from memory_utils import ensure_initialized, store_memory_block
+
+
+@dataclass
+class TurnResult:
+    """What one step produced and how long each part took"""
+    turn: int
+    reply: str
+    stats: TurnStats            # Model call timings
+    plan: PromptPlan            # How the prompt was assembled
+    context_time: float = 0.0   # Seconds spent assembling the prompt
+    store_time: float = 0.0     # Seconds spent logging and storing the memory
+    total_time: float = 0.0     # The whole step
+
+
+class ConversationEngine:
+    """Runs conversation turns against a model backend and the memory bank
+
+    decay_every / age_every: turns between random and age-based decay
+    sweeps (ARTISTIC SIMULATION), run on a background DecayScheduler;
+    0 disables that kind. log_file (in log_format) and stats_file (JSONL)
+    are appended to through buffered ConversationLogs when given; either
+    may also be a ConversationLog shared with other engines, which is then
+    left open on close. With prefetch the next turn's context is loaded
+    between steps.
+    """
+
+    def __init__(self, backend, token_budget=DEFAULT_TOKEN_BUDGET, decay_every=10, age_every=30,
+                 decay_unit="turns", on_decay=None, prefetch=True, log_file=None, stats_file=None,
+                 log_format="text"):
+        self.backend = backend
+        self.turns = 0
+        self.log_file = log_file
+        self.stats_file = stats_file
+        self._owned_logs = []
+        self.log = self._open_log(log_file, log_format)
+        self.stats_log = self._open_log(stats_file, "jsonl")
+        self.prefetch = prefetch
+        self.prefetcher = ContextPrefetcher(token_budget)
+        self.decay_scheduler = None
+        if decay_every or age_every:
+            self.decay_scheduler = DecayScheduler(
+                random_every=decay_every,
+                age_every=age_every,
+                unit=decay_unit,
+                on_report=on_decay,
+            )
+        self._started = False
+
+    def start(self):
+        """Open the bank, start the decay worker and the first context prefetch"""
+        if not self._started:
+            self._started = True
+            ensure_initialized()
+            if self.decay_scheduler is not None:
+                self.decay_scheduler.start()
+            if self.prefetch:
+                self.prefetcher.start()
+        return self
+
+    def step(self, user_input, on_token=None, on_reply=None):
+        """Run one turn; returns a TurnResult
+
+        `on_token` streams the reply piece by piece as in llm_backends.generate.
+        `on_reply(reply, stats, plan)` is called once the model is done, before
+        the exchange is logged and stored.
+        """
+        self.start()
+        start = time.perf_counter()
+        self.turns += 1
+        if self.decay_scheduler is not None:
+            # Let the background decay worker know a turn happened (ARTISTIC SIMULATION)
+            self.decay_scheduler.notify_turn()
+
+        # What the turn waited for its context (little when it was prefetched)
+        with metrics.span("context_wait"):
+            plan = self.prefetcher.take(user_input, query=user_input)
+        context_done = time.perf_counter()
+        metrics.incr("context_prefetched" if plan.prefetched else "context_loaded")
+
+        with metrics.span("model_call"):
+            reply, stats = generate(self.backend, plan.prompt, on_token=on_token)
+        model_done = time.perf_counter()
+        if on_reply is not None:
+            on_reply(reply, stats, plan)
+
+        with metrics.span("log_append"):
+            self._record(user_input, reply, stats, plan)
+        store_memory_block(f"User: {user_input}\nAI: {reply}")
+        if self.prefetch:
+            self.prefetcher.start()
+        end = time.perf_counter()
+        metrics.observe("turn", end - start)
+        metrics.incr("turns")
+
+        return TurnResult(
+            turn=self.turns,
+            reply=reply,
+            stats=stats,
+            plan=plan,
+            context_time=context_done - start,
+            store_time=end - model_done,  # (includes on_reply)
+            total_time=end - start,
+        )
+
+    def _open_log(self, target, fmt):
+        if not target:
+            return None
+        if isinstance(target, ConversationLog):
+            return target
+        log = ConversationLog(target, fmt=fmt)
+        self._owned_logs.append(log)
+        return log
+
+    def _record(self, user_input, reply, stats, plan):
+        now = datetime.now()
+        if self.stats_log is not None:
+            self.stats_log.append({"time": now.isoformat(), "turn": self.turns,
+                                   **stats.to_dict(), **plan.to_dict()})
+        if self.log is not None:
+            self.log.append({"time": now.isoformat(sep=" "), "turn": self.turns, "user": user_input, "ai": reply})
+
+    def close(self):
+        """Stop the decay worker (an in-flight sweep finishes first) and flush the logs"""
+        if self.decay_scheduler is not None and self._started:
+            self.decay_scheduler.stop()
+        for log in self._owned_logs:
+            log.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,248 @@
+"""
+Conversation log - buffered, rotating append-only log of the turns
+
+    log = ConversationLog("logs/full_log.jsonl", fmt="jsonl")
+    log.append({"time": ..., "user": ..., "ai": ...})
+    ...
+    log.close()
+
+append() only queues the encoded entry; a background thread writes the
+queue to a file kept open for the log's lifetime every flush_seconds (or
+sooner, once LOG_BUFFER_BYTES are waiting), so a turn never waits on the
+disk. What a crash can lose is bounded by that window:
+
+    fsync='always'    every append is written and fsynced before it returns
+    fsync='interval'  each flush is fsynced - at most flush_seconds lost,
+                      even if the machine loses power
+    fsync='never'     each flush reaches the OS - at most flush_seconds lost
+                      if the process dies, more if the machine does
+
+Once the file passes max_bytes it is renamed to a timestamped segment
+(full_log.jsonl.20250101_120000_000000) and a fresh file is started; the
+segment is gzipped on a background thread and only the newest `backups`
+segments are kept.
+
+Formats: 'text' is the readable "[time] / User: / AI:" transcript;
+'jsonl' is one JSON object per line, read back with replay() (load_harness
+takes it as a transcript too).
+"""
+
+import atexit
+import glob
+import gzip
+import json
+import os
+import shutil
+import threading
+import weakref
+from datetime import datetime
+
+LOG_FLUSH_SECONDS = float(os.environ.get("DIGITAL_DECAY_LOG_FLUSH", 1.0))
+LOG_FSYNC = os.environ.get("DIGITAL_DECAY_LOG_FSYNC", "interval")      # 'always', 'interval' or 'never'
+LOG_MAX_BYTES = int(os.environ.get("DIGITAL_DECAY_LOG_MAX_BYTES", 8 * 1024 * 1024))
+LOG_BACKUPS = int(os.environ.get("DIGITAL_DECAY_LOG_BACKUPS", 20))    # Rotated segments kept (0: keep all)
+LOG_BUFFER_BYTES = 64 * 1024  # Flush early once this much is waiting
+
+_open_logs = weakref.WeakSet()
+
+
+def format_entry(entry, fmt):
+    """One log entry as the bytes written for it"""
+    if fmt == "jsonl":
+        return (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+    return f"[{entry.get('time', '')}]\nUser: {entry.get('user', '')}\nAI: {entry.get('ai', '')}\n\n".encode("utf-8")
+
+
+class ConversationLog:
+    """Append-only log with a background writer, rotation and gzip of old segments
+
+    Thread-safe: sessions of the session server share one.
+    """
+
+    def __init__(self, path, fmt="text", flush_seconds=LOG_FLUSH_SECONDS, fsync=LOG_FSYNC,
+                 max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS, compress=True):
+        if fmt not in ("text", "jsonl"):
+            raise ValueError(f"Unknown log format: {fmt}")
+        if fsync not in ("always", "interval", "never"):
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.path = path
+        self.fmt = fmt
+        self.flush_seconds = flush_seconds
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.compress = compress
+        self.entries_written = 0
+        self.rotations = 0
+
+        self._lock = threading.Lock()      # The pending buffer
+        self._io_lock = threading.Lock()   # The file and rotation
+        self._pending = []
+        self._pending_bytes = 0
+        self._closed = False
+        self._compressors = []
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "ab")
+        self._size = self._file.tell()
+
+        # Segments left uncompressed by an earlier run that stopped mid-way
+        if compress:
+            for segment in self.segments():
+                if not segment.endswith(".gz"):
+                    self._start_compression(segment)
+
+        self._wake = threading.Event()
+        self._thread = None
+        if fsync != "always":
+            self._thread = threading.Thread(target=self._run, name="conversation-log", daemon=True)
+            self._thread.start()
+        _open_logs.add(self)
+
+    def append(self, entry):
+        """Queue one entry (a dict; 'text' logs use its time, user and ai keys)"""
+        data = format_entry(entry, self.fmt)
+        with self._lock:
+            if self._closed:
+                raise ValueError("append to a closed conversation log")
+            self._pending.append(data)
+            self._pending_bytes += len(data)
+            early = self._pending_bytes >= LOG_BUFFER_BYTES
+        if self.fsync == "always":
+            self.flush()
+        elif early:
+            self._wake.set()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"💾 Log write failed: {e} 💾")
+
+    def flush(self):
+        """Write out everything queued so far (fsynced unless fsync='never')"""
+        with self._io_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                self._pending_bytes = 0
+            if not pending:
+                return
+            for data in pending:
+                if self._size and self._size + len(data) > self.max_bytes:
+                    self._finish_file()
+                    self._rotate_locked()
+                self._file.write(data)
+                self._size += len(data)
+            self._finish_file()
+            self.entries_written += len(pending)
+
+    def _finish_file(self):
+        self._file.flush()
+        if self.fsync != "never":
+            os.fsync(self._file.fileno())
+
+    def _rotate_locked(self):
+        """Move the current file aside as a segment and start a new one"""
+        self._file.close()
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        segment = f"{self.path}.{stamp}"
+        while os.path.exists(segment) or os.path.exists(segment + ".gz"):
+            segment += "_"
+        os.replace(self.path, segment)
+        self._file = open(self.path, "ab")
+        self._size = 0
+        self.rotations += 1
+        if self.compress:
+            self._start_compression(segment)
+        self._prune()
+
+    def _start_compression(self, segment):
+        self._compressors = [t for t in self._compressors if t.is_alive()]
+        thread = threading.Thread(target=_compress_segment, args=(segment,), name="conversation-log-gzip",
+                                  daemon=True)
+        thread.start()
+        self._compressors.append(thread)
+
+    def segments(self):
+        """Rotated segments, oldest first (compressed ones end in .gz)"""
+        return log_segments(self.path)
+
+    def _prune(self):
+        if not self.backups:
+            return
+        for segment in self.segments()[:-self.backups]:
+            try:
+                os.remove(segment)
+            except OSError:
+                pass  # Still being compressed; removed at a later rotation
+
+    def close(self):
+        """Write out what's queued and close the file (waits for compression)"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        with self._io_lock:
+            self._file.close()
+        for thread in self._compressors:
+            thread.join()
+        _open_logs.discard(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def log_segments(path):
+    """Rotated segments of the log at `path`, oldest first
+
+    A segment found both plain and gzipped (compression stopped between the
+    two steps) is listed once, as the finished .gz.
+    """
+    found = set(glob.glob(glob.escape(path) + ".*"))
+    segments = [p for p in found if not p.endswith(".tmp") and p + ".gz" not in found]
+    return sorted(segments, key=lambda p: p[:-3] if p.endswith(".gz") else p)
+
+
+def _compress_segment(segment):
+    """gzip a rotated segment next to itself, then drop the original"""
+    tmp_path = f"{segment}.gz.tmp"
+    try:
+        with open(segment, "rb") as src, gzip.open(tmp_path, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp_path, f"{segment}.gz")
+        os.remove(segment)
+    except OSError as e:
+        print(f"💾 Log compression failed for {segment}: {e} 💾")
+
+
+def replay(path):
+    """Yield the entries of a JSONL log, rotated segments first, oldest first
+
+    A line cut short by a crash ends its segment instead of raising.
+    """
+    for log_path in log_segments(path) + [path]:
+        if not os.path.exists(log_path):
+            continue
+        opener = gzip.open if log_path.endswith(".gz") else open
+        with opener(log_path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    break
+
+
+@atexit.register
+def _close_all():
+    for log in list(_open_logs):
+        log.close()
@@ -9,7 +9,9 @@ from memory_utils import (
     store_memory_block, 
     load_random_memories, 
     simulate_memory_decay, 
-    age_memories_over_time
+    age_memories_over_time,
+    get_memory_integrity,
+    ensure_initialized
 )
 
 def debug_memory_reading():
@@ -17,6 +19,7 @@ def debug_memory_reading():
     print("🔍 DEBUGGING MEMORY READING")
     print("="*50)
     
+    ensure_initialized()
     memory_dir = os.path.join(os.path.dirname(__file__), '../memory_bank')
     files = [f for f in os.listdir(memory_dir) if f.endswith('.txt')]
     
@@ -35,13 +38,6 @@ def debug_memory_reading():
                 content = f.read()
                 print(f"   Status: ✅ READABLE")
                 print(f"   Content: {content[:100]}...")
-                
-                # Check corruption level
-                readable_chars = len([c for c in content if c.isprintable()])
-                total_chars = len(content)
-                corruption_level = (total_chars - readable_chars) / total_chars if total_chars > 0 else 0
-                print(f"   Corruption: {corruption_level:.1%}")
-                
         except UnicodeDecodeError as e:
             print(f"   Status: ❌ ENCODING ERROR")
             print(f"   Error: {e}")
@@ -51,6 +47,15 @@ def debug_memory_reading():
         except Exception as e:
             print(f"   Status: ❌ OTHER ERROR")
             print(f"   Error: {e}")
+        
+        # Check corruption level (from the integrity manifest, no file read needed)
+        entry = get_memory_integrity(filename)
+        if entry is None:
+            print(f"   Corruption: unknown (not in manifest)")
+        else:
+            print(f"   Corruption: {1 - entry.integrity:.1%} "
+                  f"({entry.length}/{entry.original_length} bytes left, "
+                  f"CRC {'intact' if entry.intact else 'changed by decay'})")
     
     print("\n" + "="*50)
     print("🧠 TESTING MEMORY LOADING")
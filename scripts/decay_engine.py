@@ -0,0 +1,167 @@
+"""
+Vectorized decay engine - ARTISTIC SIMULATION, REMOVE FOR REAL HARDWARE
+
+Corrupts memory contents the same way the original per-character loop did
+(each character survives with probability 1 - rate), but works on whole byte
+buffers with NumPy masks and can decay many memories in a single batch.
+
+Decisions are made per UTF-8 character rather than per byte: continuation
+bytes follow their lead byte, so decay drops whole characters and never
+leaves a half-encoded one behind.
+"""
+
+import heapq
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class DecayReport:
+    """Summary of one decay sweep over the bank"""
+    files_scanned: int = 0      # Memories picked by a policy and examined
+    files_corrupted: int = 0
+    bytes_removed: int = 0
+    elapsed: float = 0.0
+    bank_size: int = 0          # Regular memories in the bank at the time
+    bytes_flipped: int = 0      # Bytes damaged in place by raw sector decay
+
+    def __str__(self):
+        damage = f"{self.bytes_removed} bytes lost"
+        if self.bytes_flipped:
+            damage += f", {self.bytes_flipped} bytes flipped"
+        return (f"{self.files_corrupted}/{self.files_scanned} memories decayed "
+                f"(bank of {self.bank_size}), {damage} in {self.elapsed * 1000:.1f} ms")
+
+
+def combine_rates(*rates):
+    """Rate of loss when several decay passes hit the same memory in turn"""
+    survive = np.ones_like(np.asarray(rates[0], dtype=np.float64))
+    for rate in rates:
+        survive = survive * (1.0 - np.asarray(rate, dtype=np.float64))
+    return 1.0 - survive
+
+
+def age_decay_chance(age_days):
+    """Chance that an age pass decays a memory of this age"""
+    return np.minimum(0.02 + np.asarray(age_days) * 0.01, 0.3)
+
+
+def age_decay_rate(age_days):
+    """Share of a memory lost when age decay hits it"""
+    return np.minimum(0.05 + np.asarray(age_days) * 0.02, 0.4)
+
+
+class DecayQueue:
+    """Priority queue of when each memory is next due for age decay
+
+    Time is counted in age passes ("ticks"). Instead of rolling a die for
+    every memory on every tick, each memory draws the number of ticks until
+    its next hit from a geometric distribution with its current per-tick
+    chance, and only memories that come due are touched. Because the chance
+    grows with age, no draw looks further ahead than `recheck_ticks`: a
+    memory whose draw lands beyond that gets a recheck event instead, where
+    it is re-drawn with its chance at that age.
+    """
+
+    def __init__(self, recheck_ticks=10):
+        self.recheck_ticks = recheck_ticks
+        self.tick = 0
+        self._heap = []   # (due_tick, name)
+        self._due = {}    # name -> (due_tick, decays); heap entries not matching are stale
+
+    def __len__(self):
+        return len(self._due)
+
+    def __contains__(self, name):
+        return name in self._due
+
+    def schedule(self, name, age_days, rng):
+        """(Re)schedule a memory's next age decay from the current tick"""
+        waits = int(rng.geometric(float(age_decay_chance(age_days))))
+        decays = waits <= self.recheck_ticks
+        due = self.tick + (waits if decays else self.recheck_ticks)
+        self._due[name] = (due, decays)
+        heapq.heappush(self._heap, (due, name))
+
+    def schedule_many(self, names, ages_days, rng):
+        """schedule() for many memories at once, with one draw for all of them"""
+        if not len(names):
+            return
+        waits = rng.geometric(age_decay_chance(np.asarray(ages_days, dtype=np.float64)))
+        for name, wait in zip(names, waits.tolist()):
+            decays = wait <= self.recheck_ticks
+            due = self.tick + (wait if decays else self.recheck_ticks)
+            self._due[name] = (due, decays)
+            heapq.heappush(self._heap, (due, name))
+
+    def discard(self, name):
+        """Stop tracking a memory (its heap entry is skipped when it surfaces)"""
+        self._due.pop(name, None)
+
+    def advance(self):
+        """Move to the next tick; returns [(name, decays)] for every memory now due
+
+        Due memories leave the queue; callers reschedule the ones that remain.
+        """
+        self.tick += 1
+        due = []
+        while self._heap and self._heap[0][0] <= self.tick:
+            tick, name = heapq.heappop(self._heap)
+            current = self._due.get(name)
+            if current is None or current[0] != tick:
+                continue  # Stale: evicted or rescheduled since
+            del self._due[name]
+            due.append((name, current[1]))
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._heap = [(d, n) for n, (d, _) in self._due.items()]
+            heapq.heapify(self._heap)
+        return due
+
+
+def make_rng(seed=None):
+    """Seedable generator for reproducible decay runs"""
+    return np.random.default_rng(seed)
+
+
+def decay_batch(buffers, rates, rng, utf8=True):
+    """Decay several byte buffers in one pass
+
+    `rates` is one corruption rate per buffer (or a single rate for all).
+    With utf8=False every byte is decided on its own (for binary data such
+    as compressed memories). Returns the decayed buffers in the same order.
+    """
+    if not buffers:
+        return []
+    lengths = np.fromiter((len(b) for b in buffers), dtype=np.int64, count=len(buffers))
+    data = np.frombuffer(b"".join(buffers), dtype=np.uint8)
+    if data.size == 0:
+        return [b"" for _ in buffers]
+
+    starts = np.zeros(len(buffers), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+
+    # A character starts at every non-continuation byte, and at every
+    # buffer boundary even if the data there is malformed
+    if utf8:
+        lead = (data & 0xC0) != 0x80
+        lead[starts[lengths > 0]] = True
+    else:
+        lead = np.ones(data.size, dtype=bool)
+    char_of_byte = np.cumsum(lead) - 1
+    n_chars = int(char_of_byte[-1]) + 1
+
+    # Rate of the buffer each character belongs to
+    rates = np.broadcast_to(np.asarray(rates, dtype=np.float64), (len(buffers),))
+    buffer_of_byte = np.repeat(np.arange(len(buffers)), lengths)
+    char_rates = rates[buffer_of_byte[lead]]
+
+    keep_char = rng.random(n_chars) > char_rates
+    keep = keep_char[char_of_byte]
+
+    kept = data[keep]
+    kept_before = np.concatenate(([0], np.cumsum(keep)))
+    ends = starts + lengths
+    new_starts = kept_before[starts]
+    new_ends = kept_before[ends]
+    return [kept[s:e].tobytes() for s, e in zip(new_starts, new_ends)]
@@ -0,0 +1,111 @@
+"""
+Background decay scheduler - ARTISTIC SIMULATION, REMOVE FOR REAL HARDWARE
+
+Runs decay sweeps on a worker thread so a conversation turn never pays for
+a bank rewrite. The cadence is either a number of turns (the REPL reports
+each turn with notify_turn) or wall-clock seconds. memory_utils' bank lock
+keeps the sweep's write-back from overlapping a context load or a store.
+"""
+
+import threading
+import time
+
+import memory_utils
+
+
+class DecayScheduler:
+    """Worker thread that runs memory_utils.decay_sweep on a cadence
+
+    unit='turns':   random decay every `random_every` turns, age decay every
+                    `age_every` turns (the REPL's original cadence).
+    unit='seconds': the same intervals measured in wall-clock seconds.
+    If the worker falls behind, due sweeps are coalesced into one.
+    """
+
+    def __init__(self, random_every=10, age_every=30, unit="turns", on_report=None):
+        if unit not in ("turns", "seconds"):
+            raise ValueError(f"Unknown decay cadence unit: {unit}")
+        self.random_every = random_every
+        self.age_every = age_every
+        self.unit = unit
+        self.on_report = on_report
+        self.sweeps = 0
+
+        self._cond = threading.Condition()
+        self._turns = 0
+        self._random_due = False
+        self._age_due = False
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="decay-scheduler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def notify_turn(self):
+        """Count one conversation turn; in 'turns' mode this may make a sweep due"""
+        with self._cond:
+            self._turns += 1
+            if self.unit != "turns":
+                return
+            if self.random_every and self._turns % self.random_every == 0:
+                self._random_due = True
+            if self.age_every and self._turns % self.age_every == 0:
+                self._age_due = True
+            if self._random_due or self._age_due:
+                self._cond.notify()
+
+    def _wait_seconds(self, next_random, next_age, now):
+        pending = [t for t in (next_random, next_age) if t is not None]
+        return max(min(pending) - now, 0) if pending else None
+
+    def _run(self):
+        # memory_utils loads the decay engine (and NumPy) on first use; do it
+        # here, while nothing is due, rather than in the first sweep
+        import decay_engine
+        clock = time.monotonic
+        start = clock()
+        next_random = start + self.random_every if self.unit == "seconds" and self.random_every else None
+        next_age = start + self.age_every if self.unit == "seconds" and self.age_every else None
+
+        while True:
+            with self._cond:
+                while not (self._stopping or self._random_due or self._age_due):
+                    timeout = self._wait_seconds(next_random, next_age, clock())
+                    if timeout == 0:
+                        break
+                    self._cond.wait(timeout)
+                if self._stopping:
+                    return
+
+                if self.unit == "seconds":
+                    now = clock()
+                    if next_random is not None and now >= next_random:
+                        self._random_due = True
+                        next_random = now + self.random_every
+                    if next_age is not None and now >= next_age:
+                        self._age_due = True
+                        next_age = now + self.age_every
+                random_due, age_due = self._random_due, self._age_due
+                self._random_due = self._age_due = False
+
+            if random_due or age_due:
+                self._sweep(random_due, age_due)
+
+    def _sweep(self, random_due, age_due):
+        try:
+            report = memory_utils.decay_sweep(random_decay=random_due, age_decay=age_due)
+        except Exception as e:
+            print(f"💾 Background decay failed: {e} 💾")
+            return
+        self.sweeps += 1
+        if self.on_report:
+            self.on_report(report, random_due, age_due)
+
+    def stop(self, timeout=10):
+        """Ask the worker to finish; an in-flight sweep completes first"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
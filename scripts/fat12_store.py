@@ -0,0 +1,708 @@
+"""
+FAT12 floppy image storage - memories inside a standard 1.44 MB disk image
+
+The image is an ordinary FAT12 volume: it can be written to a real floppy
+with `dd`, or mounted through a loopback device to inspect it. Memories live
+in a MEMBANK subdirectory (the root directory only has 224 slots) under
+their full names via VFAT long file name entries.
+
+All sector I/O goes through a small LRU sector cache. The FAT is read in one
+go at mount time, the directory sectors are read ahead in contiguous runs,
+and dirty sectors are written back sorted and coalesced into sector-aligned
+runs at the end of each operation. Free directory slots are tracked in
+memory from mount on, so a write never rescans the directory: a turn costs
+a bounded number of sector I/Os regardless of how many memories are on
+the disk.
+"""
+
+import bisect
+import errno
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+from memory_index import parse_memory_timestamp
+
+SECTOR_SIZE = 512
+FLOPPY_144_SECTORS = 2880
+MEMORY_DIRNAME = b"MEMBANK    "
+
+ATTR_LFN = 0x0F
+ATTR_DIRECTORY = 0x10
+ATTR_ARCHIVE = 0x20
+DELETED = 0xE5
+FAT_EOC = 0xFFF
+FAT_BAD = 0xFF7
+
+DIR_ENTRY = struct.Struct("<11sBBBHHHHHHHI")
+ENTRIES_PER_SECTOR = SECTOR_SIZE // DIR_ENTRY.size
+MEMORY_DIR_ENTRIES = 3  # A mem_<timestamp>.txt name: two long-name entries and the 8.3 one
+LFN_CHARS = 13
+
+
+class Fat12Error(Exception):
+    """Raised for an image that isn't a usable FAT12 volume"""
+
+
+# ============================================================================
+# IMAGE FORMATTING
+# ============================================================================
+
+def format_image(path, label="DIGIDECAY"):
+    """Create a blank, standard 1.44 MB FAT12 floppy image"""
+    boot = bytearray(SECTOR_SIZE)
+    boot[0:3] = b"\xEB\x3C\x90"
+    boot[3:11] = b"MSWIN4.1"
+    # BPB: bytes/sector, sectors/cluster, reserved sectors, FATs, root entries,
+    # total sectors, media descriptor, sectors/FAT, sectors/track, heads,
+    # hidden sectors, large total sectors
+    struct.pack_into("<HBHBHHBHHHII", boot, 11,
+                     SECTOR_SIZE, 1, 1, 2, 224, FLOPPY_144_SECTORS, 0xF0, 9, 18, 2, 0, 0)
+    volume_id = int(time.time()) & 0xFFFFFFFF
+    struct.pack_into("<BBBI11s8s", boot, 36, 0, 0, 0x29, volume_id,
+                     label.upper().encode("ascii")[:11].ljust(11), b"FAT12   ")
+    boot[510:512] = b"\x55\xAA"
+
+    fat = bytearray(9 * SECTOR_SIZE)
+    fat[0:3] = b"\xF0\xFF\xFF"  # Media descriptor and reserved cluster 1
+
+    with open(path, "wb") as f:
+        f.write(boot)
+        f.write(fat)
+        f.write(fat)
+        f.truncate(FLOPPY_144_SECTORS * SECTOR_SIZE)
+
+
+# ============================================================================
+# SECTOR CACHE
+# ============================================================================
+
+class SectorCache:
+    """LRU cache of image sectors with batched, coalesced write-back"""
+
+    def __init__(self, fd, capacity=256):
+        self.fd = fd
+        self.capacity = capacity
+        self._sectors = OrderedDict()  # sector number -> bytearray
+        self._dirty = set()
+        # I/O counters (one pread/pwrite call = one I/O)
+        self.read_ios = 0
+        self.write_ios = 0
+        self.sectors_read = 0
+        self.sectors_written = 0
+
+    def _insert(self, sector, data):
+        self._sectors[sector] = data
+        self._sectors.move_to_end(sector)
+        while len(self._sectors) > self.capacity:
+            oldest = next(iter(self._sectors))
+            if oldest in self._dirty:
+                self.flush()  # Write back everything at once rather than one sector
+            self._sectors.popitem(last=False)
+
+    def read_ahead(self, start, count):
+        """Load a run of sectors with one read, skipping any already cached"""
+        missing = [s for s in range(start, start + count) if s not in self._sectors]
+        if not missing:
+            return
+        first, last = missing[0], missing[-1]
+        data = os.pread(self.fd, (last - first + 1) * SECTOR_SIZE, first * SECTOR_SIZE)
+        self.read_ios += 1
+        self.sectors_read += last - first + 1
+        for s in range(first, last + 1):
+            if s not in self._sectors:
+                off = (s - first) * SECTOR_SIZE
+                self._insert(s, bytearray(data[off:off + SECTOR_SIZE].ljust(SECTOR_SIZE, b"\0")))
+
+    def read(self, sector):
+        """Cached, mutable contents of one sector (call mark_dirty after changing it)"""
+        data = self._sectors.get(sector)
+        if data is None:
+            self.read_ahead(sector, 1)
+            data = self._sectors[sector]
+        else:
+            self._sectors.move_to_end(sector)
+        return data
+
+    def write(self, sector, data):
+        """Replace a whole sector without reading it first"""
+        self._insert(sector, bytearray(data.ljust(SECTOR_SIZE, b"\0")))
+        self._dirty.add(sector)
+
+    def mark_dirty(self, sector):
+        self._dirty.add(sector)
+
+    def flush(self):
+        """Write dirty sectors back as sorted, contiguous runs"""
+        if not self._dirty:
+            return
+        run = []
+        for sector in sorted(self._dirty):
+            if run and sector != run[-1] + 1:
+                self._write_run(run)
+                run = []
+            run.append(sector)
+        self._write_run(run)
+        self._dirty.clear()
+
+    def _write_run(self, run):
+        data = b"".join(bytes(self._sectors[s]) for s in run)
+        os.pwrite(self.fd, data, run[0] * SECTOR_SIZE)
+        self.write_ios += 1
+        self.sectors_written += len(run)
+
+    def write_raw(self, start, data):
+        """Write sector-aligned data that bypasses the cache (FAT copies)"""
+        os.pwrite(self.fd, data, start * SECTOR_SIZE)
+        self.write_ios += 1
+        self.sectors_written += len(data) // SECTOR_SIZE
+
+    def stats(self):
+        return {
+            "read_ios": self.read_ios,
+            "write_ios": self.write_ios,
+            "sectors_read": self.sectors_read,
+            "sectors_written": self.sectors_written,
+            "cached": len(self._sectors),
+        }
+
+
+# ============================================================================
+# DIRECTORY ENTRY HELPERS
+# ============================================================================
+
+def _lfn_checksum(short_name):
+    total = 0
+    for c in short_name:
+        total = (((total & 1) << 7) + (total >> 1) + c) & 0xFF
+    return total
+
+
+def _lfn_entries(long_name, short_name):
+    """VFAT long-name entries for a name, in on-disk order (last part first)"""
+    chars = long_name.encode("utf-16-le")
+    units = [chars[i:i + 2] for i in range(0, len(chars), 2)]
+    parts = (len(units) + LFN_CHARS - 1) // LFN_CHARS
+    padded = units + [b"\0\0"] if len(units) % LFN_CHARS else units
+    padded += [b"\xFF\xFF"] * (parts * LFN_CHARS - len(padded))
+    checksum = _lfn_checksum(short_name)
+    entries = []
+    for seq in range(parts, 0, -1):
+        chunk = b"".join(padded[(seq - 1) * LFN_CHARS:seq * LFN_CHARS])
+        order = seq | (0x40 if seq == parts else 0)
+        entries.append(struct.pack("<B10sBBB12sH4s", order, chunk[0:10], ATTR_LFN, 0,
+                                   checksum, chunk[10:22], 0, chunk[22:26]))
+    return entries
+
+
+def _lfn_part(entry):
+    """(sequence, order flags, checksum, text) from one long-name entry"""
+    order = entry[0]
+    raw = entry[1:11] + entry[14:26] + entry[28:32]
+    text = raw.decode("utf-16-le", errors="replace")
+    end = text.find("\0")
+    return order & 0x1F, order, entry[13], text if end < 0 else text[:end]
+
+
+def _fat_datetime(timestamp):
+    dt = datetime.fromtimestamp(timestamp)
+    year = min(max(dt.year, 1980), 2107)
+    date = ((year - 1980) << 9) | (dt.month << 5) | dt.day
+    ftime = (dt.hour << 11) | (dt.minute << 5) | (dt.second // 2)
+    tenths = (dt.second % 2) * 100 + dt.microsecond // 10000
+    return date, ftime, tenths
+
+
+def _from_fat_datetime(date, ftime, tenths):
+    try:
+        dt = datetime(1980 + (date >> 9), (date >> 5) & 0x0F or 1, date & 0x1F or 1,
+                      ftime >> 11, (ftime >> 5) & 0x3F, (ftime & 0x1F) * 2)
+    except ValueError:
+        return 0.0
+    return dt.timestamp() + tenths / 100
+
+
+class _FileRecord:
+    __slots__ = ("slots", "first_cluster", "size", "created")
+
+    def __init__(self, slots, first_cluster, size, created):
+        self.slots = slots                # [(sector, index)] of LFN entries + short entry
+        self.first_cluster = first_cluster
+        self.size = size
+        self.created = created
+
+
+# ============================================================================
+# FAT12 STORAGE BACKEND
+# ============================================================================
+
+class Fat12Storage:
+    """Memory storage inside a FAT12 floppy image file"""
+
+    kind = "fat12"
+
+    def __init__(self, path, cache_sectors=256, create=True):
+        self.path = path
+        self._lock = threading.RLock()
+        if not os.path.exists(path):
+            if not create:
+                raise FileNotFoundError(path)
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            format_image(path)
+        self._fd = os.open(path, os.O_RDWR)
+        self.cache = SectorCache(self._fd, capacity=cache_sectors)
+        self._mount()
+
+    # ------------------------------------------------------------------
+    # Mounting
+    # ------------------------------------------------------------------
+
+    def _mount(self):
+        boot = self.cache.read(0)
+        (bytes_per_sector, self.sectors_per_cluster, reserved, self.num_fats, root_entries,
+         total16, _media, self.fat_sectors) = struct.unpack_from("<HBHBHHBH", boot, 11)
+        total32 = struct.unpack_from("<I", boot, 32)[0]
+        if bytes_per_sector != SECTOR_SIZE or boot[510:512] != b"\x55\xAA":
+            raise Fat12Error(f"{self.path} is not a FAT12 floppy image")
+        self.total_sectors = total16 or total32
+        self.fat_start = reserved
+        self.root_start = reserved + self.num_fats * self.fat_sectors
+        self.root_sectors = (root_entries * DIR_ENTRY.size + SECTOR_SIZE - 1) // SECTOR_SIZE
+        self.data_start = self.root_start + self.root_sectors
+        self.cluster_count = (self.total_sectors - self.data_start) // self.sectors_per_cluster
+        if self.cluster_count >= 4085:
+            raise Fat12Error(f"{self.path} is FAT16-sized, not FAT12")
+        self.cluster_bytes = self.sectors_per_cluster * SECTOR_SIZE
+
+        # Read-ahead: the whole first FAT in one I/O, kept in memory since
+        # 12-bit entries straddle sector boundaries
+        self.fat = bytearray(os.pread(self._fd, self.fat_sectors * SECTOR_SIZE,
+                                      self.fat_start * SECTOR_SIZE))
+        self.cache.read_ios += 1
+        self.cache.sectors_read += self.fat_sectors
+        self._fat_dirty = set()
+        self._next_free = 2
+
+        # Read-ahead: the whole root directory in one I/O
+        self.cache.read_ahead(self.root_start, self.root_sectors)
+        self._dir_cluster = self._find_or_create_memory_dir()
+        self._load_directory()
+
+    # ------------------------------------------------------------------
+    # FAT
+    # ------------------------------------------------------------------
+
+    def _fat_get(self, cluster):
+        off = cluster * 3 // 2
+        value = self.fat[off] | (self.fat[off + 1] << 8)
+        return value >> 4 if cluster & 1 else value & 0xFFF
+
+    def _fat_set(self, cluster, value):
+        off = cluster * 3 // 2
+        if cluster & 1:
+            self.fat[off] = (self.fat[off] & 0x0F) | ((value << 4) & 0xF0)
+            self.fat[off + 1] = (value >> 4) & 0xFF
+        else:
+            self.fat[off] = value & 0xFF
+            self.fat[off + 1] = (self.fat[off + 1] & 0xF0) | ((value >> 8) & 0x0F)
+        self._fat_dirty.add(off // SECTOR_SIZE)
+        self._fat_dirty.add((off + 1) // SECTOR_SIZE)
+
+    def _chain(self, first):
+        clusters = []
+        cluster = first
+        while 2 <= cluster < 2 + self.cluster_count and len(clusters) <= self.cluster_count:
+            clusters.append(cluster)
+            cluster = self._fat_get(cluster)
+        return clusters
+
+    def _allocate(self, count):
+        """Claim `count` free clusters (next-fit) and chain them together"""
+        if count == 0:
+            return []
+        found = []
+        last = 2 + self.cluster_count
+        cluster = self._next_free
+        for _ in range(self.cluster_count):
+            if cluster >= last:
+                cluster = 2
+            if self._fat_get(cluster) == 0:
+                found.append(cluster)
+                if len(found) == count:
+                    break
+            cluster += 1
+        if len(found) < count:
+            raise OSError(errno.ENOSPC, "floppy image is full", self.path)
+        for a, b in zip(found, found[1:]):
+            self._fat_set(a, b)
+        self._fat_set(found[-1], FAT_EOC)
+        self._next_free = found[-1] + 1
+        return found
+
+    def _free_chain(self, clusters):
+        for cluster in clusters:
+            self._fat_set(cluster, 0)
+
+    def allocated_size(self, size):
+        """Space a memory of `size` bytes takes: whole clusters plus its directory entries"""
+        return self._clusters_for(size) * self.cluster_bytes + MEMORY_DIR_ENTRIES * DIR_ENTRY.size
+
+    def capacity(self):
+        """Bytes the image can give to memories (the data area less MEMBANK's first cluster)"""
+        return (self.cluster_count - 1) * self.cluster_bytes
+
+    def free_bytes(self):
+        free = sum(1 for c in range(2, 2 + self.cluster_count) if self._fat_get(c) == 0)
+        return free * self.cluster_bytes
+
+    def _cluster_sector(self, cluster):
+        return self.data_start + (cluster - 2) * self.sectors_per_cluster
+
+    def _read_ahead_chain(self, clusters):
+        """Read a cluster chain in as few I/Os as its contiguous runs allow"""
+        run_start = prev = None
+        for cluster in clusters + [None]:
+            if cluster is not None and prev is not None and cluster == prev + 1:
+                prev = cluster
+                continue
+            if run_start is not None:
+                self.cache.read_ahead(self._cluster_sector(run_start),
+                                      (prev - run_start + 1) * self.sectors_per_cluster)
+            run_start = prev = cluster
+
+    # ------------------------------------------------------------------
+    # Directories
+    # ------------------------------------------------------------------
+
+    def _root_slots(self):
+        for sector in range(self.root_start, self.root_start + self.root_sectors):
+            for index in range(ENTRIES_PER_SECTOR):
+                yield sector, index
+
+    def _dir_slots(self):
+        for cluster in self._chain(self._dir_cluster):
+            start = self._cluster_sector(cluster)
+            for sector in range(start, start + self.sectors_per_cluster):
+                for index in range(ENTRIES_PER_SECTOR):
+                    yield sector, index
+
+    def _entry(self, sector, index):
+        data = self.cache.read(sector)
+        return data[index * DIR_ENTRY.size:(index + 1) * DIR_ENTRY.size]
+
+    def _set_entry(self, sector, index, entry):
+        data = self.cache.read(sector)
+        data[index * DIR_ENTRY.size:(index + 1) * DIR_ENTRY.size] = entry
+        self.cache.mark_dirty(sector)
+
+    def _short_entry(self, short_name, attr, first_cluster, size, created):
+        date, ftime, tenths = _fat_datetime(created)
+        return DIR_ENTRY.pack(short_name, attr, 0, tenths, ftime, date, date, 0,
+                              ftime, date, first_cluster, size)
+
+    def _find_or_create_memory_dir(self):
+        free = None
+        for sector, index in self._root_slots():
+            entry = self._entry(sector, index)
+            if entry[0] == 0:
+                free = free or (sector, index)
+                break
+            if entry[0] == DELETED:
+                free = free or (sector, index)
+                continue
+            if entry[0:11] == MEMORY_DIRNAME and entry[11] & ATTR_DIRECTORY:
+                return struct.unpack_from("<H", entry, 26)[0]
+        if free is None:
+            raise Fat12Error("root directory is full")
+
+        # New, empty MEMBANK directory with its . and .. entries
+        cluster = self._allocate(1)[0]
+        now = time.time()
+        first = self._cluster_sector(cluster)
+        dot = self._short_entry(b".          ", ATTR_DIRECTORY, cluster, 0, now)
+        dotdot = self._short_entry(b"..         ", ATTR_DIRECTORY, 0, 0, now)
+        self.cache.write(first, dot + dotdot)
+        for sector in range(first + 1, first + self.sectors_per_cluster):
+            self.cache.write(sector, b"")
+        self._set_entry(*free, self._short_entry(MEMORY_DIRNAME, ATTR_DIRECTORY, cluster, 0, now))
+        self._flush()
+        return cluster
+
+    def _load_directory(self):
+        """Index the MEMBANK directory: long name -> entry slots, cluster, size"""
+        self._read_ahead_chain(self._chain(self._dir_cluster))
+        self._files = {}
+        self._short_names = set()
+        self._counter = 0
+        # Free-slot map, kept current by write and delete so finding room
+        # for a new entry never rereads the directory: every slot in
+        # directory order, the deleted ones among them (sorted) and where
+        # the never-used tail starts
+        self._dir_positions = list(self._dir_slots())
+        self._slot_pos = {slot: pos for pos, slot in enumerate(self._dir_positions)}
+        self._free_positions = []
+        self._dir_end = len(self._dir_positions)
+        lfn_parts, lfn_slots, lfn_checksum = {}, [], None
+        for pos, (sector, index) in enumerate(self._dir_positions):
+            entry = self._entry(sector, index)
+            if entry[0] == 0:
+                self._dir_end = pos
+                break
+            if entry[0] == DELETED:
+                self._free_positions.append(pos)
+                lfn_parts, lfn_slots = {}, []
+                continue
+            if entry[11] == ATTR_LFN:
+                seq, order, checksum, text = _lfn_part(entry)
+                if order & 0x40:
+                    lfn_parts, lfn_slots = {}, []
+                lfn_parts[seq] = text
+                lfn_slots.append((sector, index))
+                lfn_checksum = checksum
+                continue
+            fields = DIR_ENTRY.unpack(entry)
+            short_name = fields[0]
+            if entry[11] & ATTR_DIRECTORY or short_name.startswith(b"."):
+                lfn_parts, lfn_slots = {}, []
+                continue
+            if lfn_parts and lfn_checksum == _lfn_checksum(short_name):
+                name = "".join(lfn_parts[k] for k in sorted(lfn_parts))
+            else:
+                base = short_name[:8].decode("ascii", "replace").rstrip()
+                ext = short_name[8:].decode("ascii", "replace").rstrip()
+                name = f"{base}.{ext}".lower() if ext else base.lower()
+                lfn_slots = []
+            created = parse_memory_timestamp(name)
+            if created is None:
+                created = _from_fat_datetime(fields[5], fields[4], fields[3])
+            self._files[name] = _FileRecord(lfn_slots + [(sector, index)], fields[10], fields[11], created)
+            self._short_names.add(short_name)
+            if short_name[0:1] == b"M" and short_name[8:] == b"TXT":
+                try:
+                    self._counter = max(self._counter, int(short_name[1:8], 16))
+                except ValueError:
+                    pass
+            lfn_parts, lfn_slots = {}, []
+
+    def _new_short_name(self):
+        while True:
+            self._counter += 1
+            short_name = f"M{self._counter:07X}TXT".encode("ascii")
+            if short_name not in self._short_names:
+                self._short_names.add(short_name)
+                return short_name
+
+    def _free_slots(self, count):
+        """Claim `count` adjacent free directory slots, growing the directory if needed
+
+        Works from the free-slot map, so no directory sector is read.
+        """
+        free = self._free_positions
+        run = 0
+        for i, pos in enumerate(free):
+            run = run + 1 if run and pos == free[i - 1] + 1 else 1
+            if run == count:
+                del free[i - count + 1:i + 1]
+                return [self._dir_positions[p] for p in range(pos - count + 1, pos + 1)]
+        # At the end of the directory, taking in deleted slots just before it
+        start = self._dir_end
+        tail = len(free)
+        while tail and free[tail - 1] == start - 1:
+            tail -= 1
+            start = free[tail]
+        while start + count > len(self._dir_positions):
+            self._grow_directory()  # May raise ENOSPC: nothing is claimed yet
+        del free[tail:]
+        self._dir_end = max(self._dir_end, start + count)
+        return [self._dir_positions[p] for p in range(start, start + count)]
+
+    def _grow_directory(self):
+        """Add one zeroed cluster to MEMBANK (runs may continue across clusters)"""
+        chain = self._chain(self._dir_cluster)
+        cluster = self._allocate(1)[0]
+        self._fat_set(chain[-1], cluster)
+        start = self._cluster_sector(cluster)
+        for sector in range(start, start + self.sectors_per_cluster):
+            self.cache.write(sector, b"")
+            for index in range(ENTRIES_PER_SECTOR):
+                self._slot_pos[(sector, index)] = len(self._dir_positions)
+                self._dir_positions.append((sector, index))
+
+    # ------------------------------------------------------------------
+    # Data
+    # ------------------------------------------------------------------
+
+    def _write_data(self, clusters, data):
+        for i, cluster in enumerate(clusters):
+            chunk = data[i * self.cluster_bytes:(i + 1) * self.cluster_bytes]
+            start = self._cluster_sector(cluster)
+            for s in range(self.sectors_per_cluster):
+                self.cache.write(start + s, chunk[s * SECTOR_SIZE:(s + 1) * SECTOR_SIZE])
+
+    def _read_data(self, clusters, size):
+        self._read_ahead_chain(clusters)
+        parts = []
+        for cluster in clusters:
+            start = self._cluster_sector(cluster)
+            for s in range(self.sectors_per_cluster):
+                parts.append(bytes(self.cache.read(start + s)))
+        return b"".join(parts)[:size]
+
+    def _clusters_for(self, size):
+        return (size + self.cluster_bytes - 1) // self.cluster_bytes
+
+    def _flush(self):
+        """Write back dirty directory/data sectors and every FAT copy"""
+        self.cache.flush()
+        if not self._fat_dirty:
+            return
+        dirty = sorted(self._fat_dirty)
+        runs = []
+        for sector in dirty:
+            if runs and sector == runs[-1][-1] + 1:
+                runs[-1].append(sector)
+            else:
+                runs.append([sector])
+        for copy in range(self.num_fats):
+            base = self.fat_start + copy * self.fat_sectors
+            for run in runs:
+                data = self.fat[run[0] * SECTOR_SIZE:(run[-1] + 1) * SECTOR_SIZE]
+                self.cache.write_raw(base + run[0], bytes(data))
+        self._fat_dirty.clear()
+
+    # ------------------------------------------------------------------
+    # Storage interface
+    # ------------------------------------------------------------------
+
+    def scan(self):
+        with self._lock:
+            items = [(name, rec.size, rec.created) for name, rec in self._files.items()]
+        return iter(items)
+
+    def exists(self, name):
+        with self._lock:
+            return name in self._files
+
+    def read(self, name):
+        with self._lock:
+            rec = self._files.get(name)
+            if rec is None:
+                raise FileNotFoundError(name)
+            return self._read_data(self._chain(rec.first_cluster), rec.size)
+
+    def write(self, name, data, created=None):
+        if created is None:
+            created = parse_memory_timestamp(name)
+            if created is None:
+                created = time.time()
+        with self._lock:
+            # The old copy (if any) is only deleted once the new one has its
+            # clusters and slots, so a full disk can't lose it
+            clusters = self._allocate(self._clusters_for(len(data)))
+            try:
+                self._write_data(clusters, data)
+                short_name = self._new_short_name()
+                entries = _lfn_entries(name, short_name)
+                entries.append(self._short_entry(short_name, ATTR_ARCHIVE,
+                                                 clusters[0] if clusters else 0, len(data), created))
+                slots = self._free_slots(len(entries))
+            except BaseException:
+                self._free_chain(clusters)
+                raise
+            if name in self._files:
+                self._delete_locked(name)
+            for slot, entry in zip(slots, entries):
+                self._set_entry(*slot, entry)
+            self._files[name] = _FileRecord(slots, clusters[0] if clusters else 0, len(data), created)
+            self._flush()
+
+    def rewrite(self, name, data):
+        """Shrink a memory in place after decay, freeing clusters it no longer needs"""
+        with self._lock:
+            rec = self._files.get(name)
+            if rec is None:
+                raise FileNotFoundError(name)
+            clusters = self._chain(rec.first_cluster)
+            needed = self._clusters_for(len(data))
+            if needed > len(clusters):
+                self.write(name, data, rec.created)
+                return
+            keep, spare = clusters[:needed], clusters[needed:]
+            self._write_data(keep, data)
+            self._free_chain(spare)
+            if keep:
+                self._fat_set(keep[-1], FAT_EOC)
+            rec.first_cluster = keep[0] if keep else 0
+            rec.size = len(data)
+            self._update_short_entry(rec)
+            self._flush()
+
+    def _update_short_entry(self, rec):
+        sector, index = rec.slots[-1]
+        entry = bytearray(self._entry(sector, index))
+        struct.pack_into("<H", entry, 26, rec.first_cluster)
+        struct.pack_into("<I", entry, 28, rec.size)
+        self._set_entry(sector, index, bytes(entry))
+
+    def _delete_locked(self, name):
+        rec = self._files.pop(name)
+        self._short_names.discard(bytes(self._entry(*rec.slots[-1])[0:11]))
+        for sector, index in rec.slots:
+            entry = bytearray(self._entry(sector, index))
+            entry[0] = DELETED
+            self._set_entry(sector, index, bytes(entry))
+            bisect.insort(self._free_positions, self._slot_pos[(sector, index)])
+        self._free_chain(self._chain(rec.first_cluster))
+
+    def delete(self, name):
+        with self._lock:
+            if name not in self._files:
+                raise FileNotFoundError(name)
+            self._delete_locked(name)
+            self._flush()
+
+    def describe(self, name):
+        return f"{self.path}::MEMBANK/{name}"
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                self._flush()
+                os.close(self._fd)
+                self._fd = None
+
+    # ------------------------------------------------------------------
+    # Raw sector decay - ARTISTIC SIMULATION, REMOVE FOR REAL HARDWARE
+    # ------------------------------------------------------------------
+
+    def corrupt_sectors(self, name, rate, rng):
+        """Flip one random bit in each byte of the memory's sectors hit with `rate`
+
+        Works on the data sectors directly, like magnetic decay would: the
+        file keeps its size, but its bytes (and possibly its UTF-8) are
+        damaged. Returns the number of bytes flipped.
+        """
+        with self._lock:
+            rec = self._files.get(name)
+            if rec is None:
+                raise FileNotFoundError(name)
+            if rec.size == 0:
+                return 0
+            clusters = self._chain(rec.first_cluster)
+            self._read_ahead_chain(clusters)
+            hits = np.flatnonzero(rng.random(rec.size) < rate)
+            bits = rng.integers(0, 8, size=hits.size)
+            for offset, bit in zip(hits.tolist(), bits.tolist()):
+                cluster = clusters[offset // self.cluster_bytes]
+                within = offset % self.cluster_bytes
+                sector = self._cluster_sector(cluster) + within // SECTOR_SIZE
+                data = self.cache.read(sector)
+                data[within % SECTOR_SIZE] ^= 1 << bit
+                self.cache.mark_dirty(sector)
+            self._flush()
+            return int(hits.size)
@@ -0,0 +1,210 @@
+"""
+Integrity manifest - how much of each memory has survived decay
+
+A compact binary sidecar next to the bank, recording per memory the length
+and CRC32 of the text as it was first written, the length and CRC32 of its
+current text, and an integrity score (the share of the memory that has
+survived, 1.0 when intact). Diagnostics, retrieval and eviction can ask how
+decayed a memory is without opening it, and a CRC check tells whether the
+text on disk is still what the manifest last saw.
+
+The file is a journal: a header, then one fixed-size record (plus name) per
+change, the last record for a name winning. It is replayed into memory on
+open and rewritten without the superseded records once they dominate.
+
+on_change(name, integrity), if given, is called after every record() and
+update(); memory_utils uses it to keep the index's least-intact eviction
+order current.
+"""
+
+import os
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+MANIFEST_MAGIC = b"DDMAN001"
+# flags, name_len, original length, original crc, length, crc, integrity
+RECORD = struct.Struct("<BHIIIIf")
+FLAG_REMOVED = 0x01
+
+# Rewrite the journal once superseded records outnumber live entries (and
+# this many more), so compaction stays amortized O(1) per record at any size
+COMPACT_SLACK = 4096
+
+
+@dataclass
+class ManifestEntry:
+    """Integrity record of one memory"""
+    original_length: int
+    original_crc: int
+    length: int
+    crc: int
+    integrity: float = 1.0
+
+    @property
+    def intact(self):
+        return self.crc == self.original_crc and self.length == self.original_length
+
+
+def crc32(data):
+    return zlib.crc32(data) & 0xFFFFFFFF
+
+
+class IntegrityManifest:
+    """Name -> ManifestEntry, persisted as an append-only journal"""
+
+    def __init__(self, path, on_change=None):
+        self.path = path
+        self.on_change = on_change
+        self._entries = {}
+        self._records = 0       # Records in the journal, live or superseded
+        self._pending = None    # Records held back by batch()
+        self._lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        size = os.fstat(self._fd).st_size
+        if size == 0:
+            os.write(self._fd, MANIFEST_MAGIC)
+            return
+        data = os.pread(self._fd, size, 0)
+        if data[:len(MANIFEST_MAGIC)] != MANIFEST_MAGIC:
+            # Not ours (or mangled beyond use): start over, it is derived data
+            os.ftruncate(self._fd, 0)
+            os.pwrite(self._fd, MANIFEST_MAGIC, 0)
+            os.lseek(self._fd, 0, os.SEEK_END)
+            return
+        pos = len(MANIFEST_MAGIC)
+        while pos + RECORD.size <= len(data):
+            flags, name_len, orig_len, orig_crc, length, crc, integrity = RECORD.unpack_from(data, pos)
+            end = pos + RECORD.size + name_len
+            if end > len(data):
+                break
+            name = data[pos + RECORD.size:end].decode("utf-8", errors="replace")
+            if flags & FLAG_REMOVED:
+                self._entries.pop(name, None)
+            else:
+                self._entries[name] = ManifestEntry(orig_len, orig_crc, length, crc, integrity)
+            self._records += 1
+            pos = end
+        if pos < len(data):
+            os.ftruncate(self._fd, pos)  # Torn tail from an interrupted append
+        os.lseek(self._fd, pos, os.SEEK_SET)
+
+    def _append(self, name, entry, flags=0):
+        encoded = name.encode("utf-8")
+        if entry is None:
+            record = RECORD.pack(flags, len(encoded), 0, 0, 0, 0, 0.0)
+        else:
+            record = RECORD.pack(flags, len(encoded), entry.original_length, entry.original_crc,
+                                 entry.length, entry.crc, entry.integrity)
+        self._records += 1
+        if self._pending is not None:
+            self._pending.append(record + encoded)
+            return
+        os.write(self._fd, record + encoded)
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self._records > 2 * len(self._entries) + COMPACT_SLACK:
+            self._compact()
+
+    @contextmanager
+    def batch(self):
+        """Collect the records of many updates and append them in one write"""
+        with self._lock:
+            self._pending = []
+        try:
+            yield self
+        finally:
+            with self._lock:
+                pending, self._pending = self._pending, None
+                if pending:
+                    os.write(self._fd, b"".join(pending))
+                    self._maybe_compact()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def names(self):
+        with self._lock:
+            return list(self._entries)
+
+    def get(self, name):
+        """The memory's ManifestEntry, or None if it isn't recorded"""
+        return self._entries.get(name)
+
+    def integrity(self, name, default=1.0):
+        """Share of the memory that survives (default for unrecorded memories)"""
+        entry = self._entries.get(name)
+        return entry.integrity if entry is not None else default
+
+    def record(self, name, data):
+        """Record a newly written memory from its plain bytes"""
+        crc = crc32(data)
+        entry = ManifestEntry(len(data), crc, len(data), crc, 1.0)
+        with self._lock:
+            self._entries[name] = entry
+            self._append(name, entry)
+        if self.on_change is not None:
+            self.on_change(name, entry.integrity)
+        return entry
+
+    def update(self, name, data, survived=1.0):
+        """Record a memory's content after decay
+
+        `survived` is the share of the memory that made it through this
+        decay pass; it scales the integrity score. Unrecorded memories are
+        taken to have been intact before.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = ManifestEntry(len(data), 0, len(data), 0, 1.0)
+                self._entries[name] = entry
+            entry.length = len(data)
+            entry.crc = crc32(data)
+            entry.integrity = max(0.0, min(1.0, entry.integrity * survived))
+            self._append(name, entry)
+        if self.on_change is not None:
+            self.on_change(name, entry.integrity)
+        return entry
+
+    def remove(self, name):
+        with self._lock:
+            if self._entries.pop(name, None) is not None:
+                self._append(name, None, FLAG_REMOVED)
+
+    def verify(self, name, data):
+        """True if `data` is the content the manifest last recorded for the memory"""
+        entry = self._entries.get(name)
+        return entry is not None and entry.length == len(data) and entry.crc == crc32(data)
+
+    def _compact(self):
+        """Rewrite the journal with one record per live memory (lock held)"""
+        tmp_path = f"{self.path}.tmp"
+        chunks = [MANIFEST_MAGIC]
+        for name, entry in self._entries.items():
+            encoded = name.encode("utf-8")
+            chunks.append(RECORD.pack(0, len(encoded), entry.original_length, entry.original_crc,
+                                      entry.length, entry.crc, entry.integrity) + encoded)
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(chunks))
+        os.replace(tmp_path, self.path)
+        os.close(self._fd)
+        self._fd = os.open(self.path, os.O_RDWR)
+        os.lseek(self._fd, 0, os.SEEK_END)
+        self._records = len(self._entries)
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
@@ -0,0 +1,382 @@
+"""
+Model backends for Digital Decay
+
+The REPL used to spawn `ollama run llama3` for every turn, paying process
+start-up and model attach each time. Backends here keep that cost out of the
+turn: the HTTP backend talks to the local model server over kept-alive
+connections and asks it to keep the model loaded between turns.
+"""
+
+import codecs
+import http.client
+import json
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlsplit
+
+DEFAULT_MODEL = "llama3"
+DEFAULT_HOST = "http://localhost:11434"
+DEFAULT_KEEP_ALIVE = "30m"  # How long the server keeps the model loaded after a turn
+PRIMARY_RETRY_SECONDS = 30  # After the model server drops out, try it again this often
+
+
+class BackendUnavailable(Exception):
+    """Raised when a backend cannot reach its model at all"""
+
+
+class ModelBackend:
+    """Interface every model backend implements"""
+
+    name = "base"
+
+    def respond(self, prompt):
+        """Return the full reply for a prompt"""
+        raise NotImplementedError
+
+    def stream(self, prompt, stats=None):
+        """Yield the reply in pieces as it is generated
+
+        Backends that can report server-side counters (eval_count and friends)
+        store them in the optional `stats` dict. The default has no streaming
+        and yields the whole reply at once.
+        """
+        yield self.respond(prompt)
+
+    def warm_up(self):
+        """Load the model ahead of the first turn (optional)"""
+
+    def close(self):
+        """Release any held processes or connections"""
+
+
+# ============================================================================
+# SUBPROCESS BACKEND - ORIGINAL BEHAVIOUR, KEPT AS A FALLBACK
+# ============================================================================
+
+class SubprocessBackend(ModelBackend):
+    """Runs the ollama CLI once per turn"""
+
+    name = "subprocess"
+
+    def __init__(self, model=DEFAULT_MODEL, command="ollama"):
+        self.model = model
+        self.command = command
+
+    def respond(self, prompt):
+        cmd = [self.command, "run", self.model]
+        try:
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE, text=True)
+        except FileNotFoundError as e:
+            raise BackendUnavailable(f"{self.command} not found") from e
+        output, _ = proc.communicate(prompt)
+        return output.strip()
+
+    def stream(self, prompt, stats=None):
+        cmd = [self.command, "run", self.model]
+        try:
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL)
+        except FileNotFoundError as e:
+            raise BackendUnavailable(f"{self.command} not found") from e
+        proc.stdin.write(prompt.encode("utf-8"))
+        proc.stdin.close()
+
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        try:
+            while True:
+                chunk = proc.stdout.read1(4096)
+                if not chunk:
+                    break
+                text = decoder.decode(chunk)
+                if text:
+                    yield text
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+        finally:
+            proc.stdout.close()
+            proc.wait()
+
+
+# ============================================================================
+# HTTP BACKEND - LONG-LIVED CLIENT FOR THE LOCAL MODEL SERVER
+# ============================================================================
+
+class _ConnectionPool:
+    """Small pool of kept-alive HTTP connections to one server"""
+
+    def __init__(self, url, size=4, timeout=300):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.https = parts.scheme == "https"
+        self.size = size
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        conn_cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return conn_cls(self.host, self.port, timeout=self.timeout)
+
+    def release(self, conn):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class OllamaHTTPBackend(ModelBackend):
+    """Talks to `ollama serve` (or a stub server) over pooled connections"""
+
+    name = "http"
+
+    def __init__(self, host=DEFAULT_HOST, model=DEFAULT_MODEL,
+                 keep_alive=DEFAULT_KEEP_ALIVE, pool_size=4, timeout=300):
+        self.host = host
+        self.model = model
+        self.keep_alive = keep_alive
+        self.pool = _ConnectionPool(host, size=pool_size, timeout=timeout)
+
+    def _request(self, path, payload):
+        """POST a JSON payload and return the open response plus its connection"""
+        body = json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+
+        # A pooled connection may have been closed by the server while idle,
+        # so retry once on a fresh one before giving up.
+        for attempt in range(2):
+            conn = self.pool.acquire()
+            try:
+                conn.request("POST", path, body=body, headers=headers)
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError,
+                    BrokenPipeError, http.client.CannotSendRequest) as e:
+                conn.close()
+                if attempt == 1:
+                    raise BackendUnavailable(f"model server dropped connection: {e}") from e
+                continue
+            except OSError as e:
+                conn.close()
+                raise BackendUnavailable(f"model server unreachable at {self.host}: {e}") from e
+
+            if response.status != 200:
+                detail = response.read().decode("utf-8", errors="replace")[:200]
+                conn.close()
+                raise BackendUnavailable(f"model server returned {response.status}: {detail}")
+            return conn, response
+
+    def _generate_payload(self, prompt):
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": False,
+            "keep_alive": self.keep_alive,
+        }
+
+    def respond(self, prompt):
+        conn, response = self._request("/api/generate", self._generate_payload(prompt))
+        try:
+            data = json.loads(response.read())
+        finally:
+            self.pool.release(conn)
+        return data.get("response", "").strip()
+
+    def stream(self, prompt, stats=None):
+        payload = self._generate_payload(prompt)
+        payload["stream"] = True
+        conn, response = self._request("/api/generate", payload)
+        finished = False
+        try:
+            # The server answers with one JSON object per line
+            for line in response:
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if data.get("response"):
+                    yield data["response"]
+                if data.get("done"):
+                    if stats is not None:
+                        stats.update({k: v for k, v in data.items() if k.endswith(("_count", "_duration"))})
+                    finished = True
+                    break
+        finally:
+            # Only a fully drained response leaves the connection reusable
+            if finished and not response.read():
+                self.pool.release(conn)
+            else:
+                conn.close()
+
+    def warm_up(self):
+        """An empty prompt makes the server load the model and keep it resident"""
+        conn, response = self._request("/api/generate", {
+            "model": self.model,
+            "keep_alive": self.keep_alive,
+        })
+        response.read()
+        self.pool.release(conn)
+
+    def close(self):
+        self.pool.close()
+
+
+class FallbackBackend(ModelBackend):
+    """Uses the primary backend and drops to the fallback while it is unreachable
+
+    After a failure the fallback answers for `retry_after` seconds, then the
+    primary is tried again, so a model server restart costs a few slow
+    turns instead of the rest of the session.
+    """
+
+    def __init__(self, primary, fallback, retry_after=PRIMARY_RETRY_SECONDS):
+        self.primary = primary
+        self.fallback = fallback
+        self.retry_after = retry_after
+        self.name = f"{primary.name}+{fallback.name}"
+        self._failed_at = None  # time.monotonic() of the primary's last failure
+
+    @property
+    def active(self):
+        """The backend the next turn goes to"""
+        failed_at = self._failed_at
+        if failed_at is None or time.monotonic() - failed_at >= self.retry_after:
+            return self.primary
+        return self.fallback
+
+    def _switch(self, error):
+        if self._failed_at is None:
+            print(f"💾 Model server unavailable ({error}), falling back to {self.fallback.name} 💾")
+        self._failed_at = time.monotonic()
+
+    def _recovered(self):
+        if self._failed_at is not None:
+            self._failed_at = None
+            print(f"💾 Model server is back, using {self.primary.name} again 💾")
+
+    def respond(self, prompt):
+        if self.active is self.primary:
+            try:
+                reply = self.primary.respond(prompt)
+            except BackendUnavailable as e:
+                self._switch(e)
+            else:
+                self._recovered()
+                return reply
+        return self.fallback.respond(prompt)
+
+    def stream(self, prompt, stats=None):
+        if self.active is self.primary:
+            try:
+                # Fall back only if the primary fails before producing anything
+                yield from self.primary.stream(prompt, stats)
+            except BackendUnavailable as e:
+                self._switch(e)
+            else:
+                self._recovered()
+                return
+        yield from self.fallback.stream(prompt, stats)
+
+    def warm_up(self):
+        active = self.active
+        try:
+            active.warm_up()
+        except BackendUnavailable as e:
+            if active is self.primary:
+                self._switch(e)
+
+    def close(self):
+        self.primary.close()
+        self.fallback.close()
+
+
+# ============================================================================
+# TURN TIMING
+# ============================================================================
+
+@dataclass
+class TurnStats:
+    """Latency figures for one model call"""
+    ttft: float                            # Seconds until the first piece arrived
+    total_time: float                      # Seconds for the whole reply
+    tokens: int                            # Generated tokens (server count, else pieces)
+    prompt_eval_ms: Optional[float] = None  # Server-side prompt evaluation time, if reported
+    prompt_tokens: Optional[int] = None     # Prompt tokens the server had to evaluate (not cached)
+
+    @property
+    def tokens_per_sec(self):
+        generating = self.total_time - self.ttft
+        if self.tokens <= 1 or generating <= 0:
+            return self.tokens / self.total_time if self.total_time > 0 else 0.0
+        # The first token is covered by ttft; the rest arrive during generation
+        return (self.tokens - 1) / generating
+
+    def to_dict(self):
+        return {
+            "ttft": round(self.ttft, 4),
+            "total_time": round(self.total_time, 4),
+            "tokens": self.tokens,
+            "tokens_per_sec": round(self.tokens_per_sec, 2),
+            "prompt_eval_ms": None if self.prompt_eval_ms is None else round(self.prompt_eval_ms, 2),
+            "prompt_tokens": self.prompt_tokens,
+        }
+
+
+def generate(backend, prompt, on_token=None):
+    """Run one model call and time it; returns (reply, TurnStats)
+
+    With `on_token` the reply is streamed and each piece is handed to the
+    callback as it arrives, while the full text is still collected.
+    """
+    server_stats = {}
+    pieces = []
+    start = time.perf_counter()
+    first = None
+
+    if on_token is None:
+        # Without streaming the first token arrives with the last one
+        pieces.append(backend.respond(prompt))
+    else:
+        for piece in backend.stream(prompt, server_stats):
+            if first is None:
+                first = time.perf_counter()
+            pieces.append(piece)
+            on_token(piece)
+
+    end = time.perf_counter()
+    reply = "".join(pieces).strip()
+    tokens = server_stats.get("eval_count") or (len(pieces) if on_token else len(reply.split()))
+    prompt_eval = server_stats.get("prompt_eval_duration")
+    stats = TurnStats(
+        ttft=(first if first is not None else end) - start,
+        total_time=end - start,
+        tokens=tokens,
+        prompt_eval_ms=prompt_eval / 1e6 if prompt_eval is not None else None,
+        prompt_tokens=server_stats.get("prompt_eval_count"),
+    )
+    return reply, stats
+
+
+def create_backend(kind="auto", model=DEFAULT_MODEL, host=DEFAULT_HOST, **kwargs):
+    """Build a backend by name: 'http', 'subprocess' or 'auto' (http with subprocess fallback)"""
+    if kind == "http":
+        return OllamaHTTPBackend(host=host, model=model, **kwargs)
+    if kind == "subprocess":
+        return SubprocessBackend(model=model)
+    if kind == "auto":
+        return FallbackBackend(OllamaHTTPBackend(host=host, model=model, **kwargs),
+                               SubprocessBackend(model=model))
+    raise ValueError(f"Unknown model backend: {kind}")
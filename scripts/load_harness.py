@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Load harness - replay scripted conversations through the turn pipeline
+
+Usage: python load_harness.py [--transcript FILE] [--turns N] [--rate R]
+                              [--token-delay S] [--memory-dir DIR] [--json]
+
+Drives ConversationEngine against the stub model server, one turn per
+transcript line (synthetic lines when no transcript is given), and reports
+p50/p99 turn latency and throughput. With --rate turns are started on an
+open-loop schedule of R per second, and a turn that starts late counts the
+wait in its latency, so a pipeline that can't keep up shows it. Memories go
+to a scratch directory unless --memory-dir is given; the run is quiet.
+"""
+
+import argparse
+import gzip
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from synthetic_turns import question
+
+
+def synthetic_transcript(count, seed=0):
+    rng = random.Random(seed)
+    return [question(rng, i) for i in range(count)]
+
+
+def load_transcript(path):
+    """User lines from a text file (one per line) or JSONL ({"user": ...} per line)
+
+    A JSONL conversation log works as is, also a gzipped rotated segment.
+    """
+    lines = []
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                line = json.loads(line).get("user", "")
+            lines.append(line)
+    return lines
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def run(engine, lines, rate):
+    """Replay the lines; returns (latencies, service times, wall time)"""
+    latencies = []
+    service = []
+    start = time.perf_counter()
+    for i, line in enumerate(lines):
+        scheduled = start + i / rate if rate else time.perf_counter()
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        result = engine.step(line)
+        finished = time.perf_counter()
+        latencies.append(finished - scheduled)
+        service.append(result.total_time)
+    return latencies, service, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay transcripts through the conversation engine")
+    parser.add_argument("--transcript", default=None, help="text or JSONL file of user turns")
+    parser.add_argument("--turns", type=int, default=200, help="turns to run (transcript repeats as needed)")
+    parser.add_argument("--rate", type=float, default=0.0, help="target turns per second (0 = back to back)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="stub model seconds per token")
+    parser.add_argument("--memory-dir", default=None, help="memory bank to use (default: a scratch directory)")
+    parser.add_argument("--no-decay", action="store_true", help="run without background decay")
+    parser.add_argument("--log", default=None, help="write a JSONL conversation log here")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    scratch = None
+    if args.memory_dir is None:
+        scratch = args.memory_dir = tempfile.mkdtemp(prefix="dd_load_")
+    # memory_utils reads these when first imported
+    os.environ["DIGITAL_DECAY_MEMORY_DIR"] = args.memory_dir
+    os.environ["DIGITAL_DECAY_QUIET"] = "1"
+    from conversation_engine import ConversationEngine
+    from llm_backends import create_backend
+    from stub_model_server import StubModelHandler, start_stub_server
+
+    lines = load_transcript(args.transcript) if args.transcript else synthetic_transcript(args.turns)
+    if not lines:
+        print("💾 No turns to replay")
+        return 1
+    lines = (lines * (args.turns // len(lines) + 1))[:args.turns]
+
+    StubModelHandler.token_delay = args.token_delay
+    server, url = start_stub_server()
+    backend = create_backend("http", host=url)
+    engine = ConversationEngine(backend, decay_every=0 if args.no_decay else 10,
+                                age_every=0 if args.no_decay else 30,
+                                log_file=args.log, log_format="jsonl")
+    try:
+        with engine:
+            latencies, service, wall = run(engine, lines, args.rate)
+    finally:
+        backend.close()
+        server.shutdown()
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        "turns": len(lines),
+        "target_rate": args.rate,
+        "throughput": len(lines) / wall,
+        "latency_p50_ms": percentile(latencies, 50) * 1000,
+        "latency_p99_ms": percentile(latencies, 99) * 1000,
+        "service_p50_ms": percentile(service, 50) * 1000,
+        "service_p99_ms": percentile(service, 99) * 1000,
+        "prefetch_hits": engine.prefetcher.hits,
+        "decay_sweeps": engine.decay_scheduler.sweeps if engine.decay_scheduler else 0,
+    }
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(f"💾 {report['turns']} turns in {wall:.2f}s: {report['throughput']:.1f} turns/s"
+              + (f" (target {args.rate:g})" if args.rate else ""))
+        print(f"   latency  p50 {report['latency_p50_ms']:.1f} ms  p99 {report['latency_p99_ms']:.1f} ms")
+        print(f"   service  p50 {report['service_p50_ms']:.1f} ms  p99 {report['service_p99_ms']:.1f} ms")
+        print(f"   prefetched contexts {report['prefetch_hits']}, decay sweeps {report['decay_sweeps']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
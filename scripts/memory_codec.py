@@ -0,0 +1,173 @@
+"""
+Optional compressed encoding for stored memories
+
+A compressed memory is a 4-byte header followed by the compressed text:
+
+    b"\\x00Z" <codec id> <dictionary id>
+
+Plain memories are stored as bare UTF-8, which never starts with a NUL, so
+both kinds can share one bank and switching compression on or off never
+makes old memories unreadable. Memories are short, so raw deflate and raw
+LZMA2 streams are used (no container headers or checksums), and deflate
+can be primed with a shared dictionary trained on the bank: the phrases
+every conversation repeats then cost a few bits instead of a few bytes.
+
+Dictionaries live as zdict_<id>.bin files next to the bank and are never
+changed once written; retraining adds a new one and older memories keep
+decoding with the dictionary they were written with.
+
+Decoding is forgiving by design: a damaged stream yields whatever decodes
+before the damage, the way a scratched floppy gives back a partial file.
+"""
+
+import lzma
+import os
+import re
+import zlib
+from collections import Counter
+
+MAGIC = b"\x00Z"
+HEADER_SIZE = 4
+
+CODEC_IDS = {"zlib": 1, "lzma": 2}
+DICT_SIZE = 16 * 1024       # Deflate looks back at most 32 KB; memories are small
+DICT_FILE = re.compile(r"^zdict_(\d{3})\.bin$")
+_LZMA_FILTERS = [{"id": lzma.FILTER_LZMA2, "preset": 9, "dict_size": 64 * 1024}]
+_DECODE_CHUNK = 64          # Input fed per step, so damage loses as little as possible
+
+
+class CodecError(ValueError):
+    """Raised when a compressed memory can't be decoded at all"""
+
+
+def is_encoded(blob):
+    """True if a stored memory carries the compressed header"""
+    return blob[:2] == MAGIC and len(blob) >= HEADER_SIZE
+
+
+def train_dictionary(samples, size=DICT_SIZE):
+    """Build a deflate dictionary from sample memory texts
+
+    Counts words and two- and three-word phrases and keeps the repeated
+    ones that would save the most bytes. Deflate codes nearby matches more
+    cheaply, so the most valuable strings go at the end.
+    """
+    counts = Counter()
+    for text in samples:
+        words = text.split()
+        for n in (1, 2, 3):
+            for i in range(len(words) - n + 1):
+                counts[" ".join(words[i:i + n])] += 1
+
+    ranked = sorted(((c * len(s), s) for s, c in counts.items() if c > 1), reverse=True)
+    picked = []
+    total = 0
+    for _, phrase in ranked:
+        piece = (phrase + " ").encode("utf-8")
+        if total + len(piece) > size:
+            continue
+        picked.append(piece)
+        total += len(piece)
+    return b"".join(reversed(picked))
+
+
+class MemoryCodec:
+    """Encodes memories with the configured compressor and decodes any of them"""
+
+    def __init__(self, kind="zlib", dict_dir=None, level=9):
+        if kind not in ("none",) + tuple(CODEC_IDS):
+            raise ValueError(f"Unknown compression: {kind}")
+        self.kind = kind
+        self.level = level
+        self.dict_dir = dict_dir
+        self._dicts = {}
+        self.dict_id = 0            # Dictionary used for new memories; 0 = none
+        if dict_dir and os.path.isdir(dict_dir):
+            for name in os.listdir(dict_dir):
+                match = DICT_FILE.match(name)
+                if match:
+                    self.dict_id = max(self.dict_id, int(match.group(1)))
+
+    @property
+    def enabled(self):
+        return self.kind != "none"
+
+    @property
+    def has_dictionary(self):
+        return self.dict_id != 0
+
+    def _dictionary(self, dict_id):
+        if dict_id not in self._dicts:
+            if not self.dict_dir:
+                raise CodecError(f"dictionary {dict_id} needed but no dictionary directory set")
+            try:
+                with open(os.path.join(self.dict_dir, f"zdict_{dict_id:03d}.bin"), "rb") as f:
+                    self._dicts[dict_id] = f.read()
+            except FileNotFoundError:
+                raise CodecError(f"dictionary {dict_id} is missing") from None
+        return self._dicts[dict_id]
+
+    def train(self, samples, size=DICT_SIZE):
+        """Train and save a new dictionary from sample texts; returns its id"""
+        if not self.dict_dir:
+            raise CodecError("no dictionary directory set")
+        if self.dict_id >= 255:
+            raise CodecError("dictionary ids exhausted")
+        zdict = train_dictionary(samples, size)
+        if not zdict:
+            return self.dict_id
+        dict_id = self.dict_id + 1
+        os.makedirs(self.dict_dir, exist_ok=True)
+        path = os.path.join(self.dict_dir, f"zdict_{dict_id:03d}.bin")
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(zdict)
+        os.replace(f"{path}.tmp", path)
+        self._dicts[dict_id] = zdict
+        self.dict_id = dict_id
+        return dict_id
+
+    def encode(self, data):
+        """Compress a memory; stays plain when compression wouldn't save anything"""
+        if not self.enabled or not data:
+            return data
+        if self.kind == "zlib":
+            dict_id = self.dict_id
+            if dict_id:
+                comp = zlib.compressobj(self.level, zlib.DEFLATED, -15, zdict=self._dictionary(dict_id))
+            else:
+                comp = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+            body = comp.compress(data) + comp.flush()
+        else:
+            dict_id = 0  # LZMA has no preset dictionaries
+            body = lzma.compress(data, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+        if HEADER_SIZE + len(body) >= len(data):
+            return data
+        return MAGIC + bytes((CODEC_IDS[self.kind], dict_id)) + body
+
+    def decode(self, blob):
+        """Plain bytes of a stored memory (as much as survives if it is damaged)"""
+        if not is_encoded(blob):
+            return blob
+        codec_id, dict_id = blob[2], blob[3]
+        body = blob[HEADER_SIZE:]
+        if codec_id == CODEC_IDS["zlib"]:
+            if dict_id:
+                decomp = zlib.decompressobj(-15, zdict=self._dictionary(dict_id))
+            else:
+                decomp = zlib.decompressobj(-15)
+            error = zlib.error
+        elif codec_id == CODEC_IDS["lzma"]:
+            decomp = lzma.LZMADecompressor(format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+            error = lzma.LZMAError
+        else:
+            raise CodecError(f"unknown codec id {codec_id}")
+
+        out = []
+        try:
+            for pos in range(0, len(body), _DECODE_CHUNK):
+                out.append(decomp.decompress(body[pos:pos + _DECODE_CHUNK]))
+                if decomp.eof:
+                    break
+        except error:
+            pass  # Keep what decoded before the damage
+        return b"".join(out)
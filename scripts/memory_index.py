@@ -0,0 +1,270 @@
+"""
+In-process index of the memory bank
+
+Built from one storage scan, then kept current by memory_utils on every
+write, delete and decay, so a conversation turn never has to list or stat
+the whole bank again.
+"""
+
+import heapq
+import random
+from dataclasses import dataclass
+from datetime import datetime
+
+CORE_PREFIX = "core_"
+MEMORY_SUFFIX = ".txt"
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S_%f"  # As written by store_memory_block: mem_<timestamp>.txt
+
+
+def memory_kind(name):
+    """'core' for identity memories, 'regular' for conversation memories"""
+    return "core" if name.startswith(CORE_PREFIX) else "regular"
+
+
+def eviction_key(name, created):
+    """Ordering key for eviction: the timestamp string in the name sorts chronologically"""
+    if name.startswith("mem_"):
+        return (name[4:-len(MEMORY_SUFFIX)], name)
+    # Regular memories that don't follow the naming scheme go by creation time,
+    # rendered in the same format so both kinds interleave correctly
+    return (datetime.fromtimestamp(created).strftime(TIMESTAMP_FORMAT), name)
+
+
+def parse_memory_timestamp(name):
+    """Creation time encoded in a mem_<timestamp>.txt name, or None"""
+    if not (name.startswith("mem_") and name.endswith(MEMORY_SUFFIX)):
+        return None
+    stamp = name[4:-len(MEMORY_SUFFIX)]
+    try:
+        # Fixed-width YYYYmmdd_HHMMSS_ffffff; slicing is ~30x faster than strptime
+        if len(stamp) != 22 or stamp[8] != "_" or stamp[15] != "_" or not stamp.replace("_", "").isdigit():
+            raise ValueError(stamp)
+        return datetime(int(stamp[0:4]), int(stamp[4:6]), int(stamp[6:8]), int(stamp[9:11]),
+                        int(stamp[11:13]), int(stamp[13:15]), int(stamp[16:22])).timestamp()
+    except ValueError:
+        return None
+
+
+@dataclass
+class MemoryEntry:
+    """What the index knows about one memory file"""
+    name: str
+    kind: str
+    size: int                 # Current size in bytes
+    created: float            # Creation time (epoch seconds)
+    allocated: int = 0        # Bytes of storage it takes (clusters, directory entries)
+
+
+class MemoryIndex:
+    """Name, kind, size and creation time of every memory in the bank"""
+
+    def __init__(self, charge=None):
+        self._entries = {}
+        # Storage space a memory of a given size takes; quotas are charged in
+        # this, content sizes stay in bytes (the identity for most backends)
+        self.charge = charge or (lambda size: size)
+        # Name lists per kind with a position map, so removal and random
+        # choice are both O(1)
+        self._names = {"core": [], "regular": []}
+        self._positions = {}
+        # Running byte usage, overall and per kind, so quota checks are O(1)
+        self.total_bytes = 0
+        self._kind_bytes = {"core": 0, "regular": 0}
+        self.allocated_bytes = 0
+        self._kind_allocated = {"core": 0, "regular": 0}
+        # Min-heap of eviction keys for regular memories. Removed names are
+        # left in place and skipped lazily when they reach the top.
+        self._eviction_heap = []
+        # Least intact first: (integrity, created, name) for regular memories,
+        # built on first use (see pop_least_intact_bytes). A memory gets a new
+        # key whenever its integrity changes; outdated keys are skipped lazily.
+        self._integrity_heap = None
+        self._integrity_of = None
+
+    @classmethod
+    def build(cls, entries, charge=None):
+        """Index (name, size, created) tuples from one storage scan"""
+        index = cls(charge)
+        for name, size, created in entries:
+            index.add(name, size, created)
+        return index
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def get(self, name):
+        return self._entries.get(name)
+
+    def add(self, name, size, created=None):
+        """Record a newly written memory (replaces any existing entry)"""
+        if name in self._entries:
+            self.remove(name)
+        if created is None:
+            created = parse_memory_timestamp(name)
+            if created is None:
+                created = datetime.now().timestamp()
+        entry = MemoryEntry(name, memory_kind(name), size, created, allocated=self.charge(size))
+        self._entries[name] = entry
+        names = self._names[entry.kind]
+        self._positions[name] = len(names)
+        names.append(name)
+        self.total_bytes += size
+        self._kind_bytes[entry.kind] += size
+        self.allocated_bytes += entry.allocated
+        self._kind_allocated[entry.kind] += entry.allocated
+        if entry.kind == "regular":
+            heapq.heappush(self._eviction_heap, eviction_key(name, created))
+            if self._integrity_heap is not None:
+                self.note_integrity(name, self._integrity_of(name))
+        return entry
+
+    def remove(self, name):
+        """Forget a deleted memory; returns its entry or None"""
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return None
+        names = self._names[entry.kind]
+        pos = self._positions.pop(name)
+        last = names.pop()
+        if last != name:
+            names[pos] = last
+            self._positions[last] = pos
+        self.total_bytes -= entry.size
+        self._kind_bytes[entry.kind] -= entry.size
+        self.allocated_bytes -= entry.allocated
+        self._kind_allocated[entry.kind] -= entry.allocated
+        if entry.kind == "regular" and len(self._eviction_heap) > 2 * len(names) + 64:
+            self._compact_heap()
+        return entry
+
+    def note_integrity(self, name, integrity):
+        """Record a regular memory's new integrity (keeps pop_least_intact_bytes current)"""
+        if self._integrity_heap is None:
+            return
+        entry = self._entries.get(name)
+        if entry is None or entry.kind != "regular":
+            return
+        heapq.heappush(self._integrity_heap, (integrity, entry.created, name))
+        if len(self._integrity_heap) > 2 * len(self._names["regular"]) + 64:
+            self._build_integrity_heap()
+
+    def _compact_heap(self):
+        """Drop stale heap keys once they outnumber the live ones"""
+        self._eviction_heap = [eviction_key(n, self._entries[n].created) for n in self._names["regular"]]
+        heapq.heapify(self._eviction_heap)
+
+    def _build_integrity_heap(self):
+        self._integrity_heap = [(self._integrity_of(n), self._entries[n].created, n) for n in self._names["regular"]]
+        heapq.heapify(self._integrity_heap)
+
+    def update_size(self, name, size):
+        """Record a memory's new size after decay rewrote it"""
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        self.total_bytes += size - entry.size
+        self._kind_bytes[entry.kind] += size - entry.size
+        entry.size = size
+        allocated = self.charge(size)
+        self.allocated_bytes += allocated - entry.allocated
+        self._kind_allocated[entry.kind] += allocated - entry.allocated
+        entry.allocated = allocated
+        return entry
+
+    def names(self, kind=None):
+        """Snapshot of memory names, optionally of one kind"""
+        if kind is None:
+            return self._names["core"] + self._names["regular"]
+        return list(self._names[kind])
+
+    def count(self, kind):
+        return len(self._names[kind])
+
+    def bytes_used(self, kind=None):
+        """Current size of the bank, or of one kind of memory, in bytes"""
+        return self.total_bytes if kind is None else self._kind_bytes[kind]
+
+    def allocated(self, kind=None):
+        """Storage space taken by the bank, or by one kind of memory (see charge)"""
+        return self.allocated_bytes if kind is None else self._kind_allocated[kind]
+
+    def choose(self, kind, rng=random):
+        """One random memory name of the given kind, or None"""
+        names = self._names[kind]
+        return rng.choice(names) if names else None
+
+    def choices(self, kind, k, rng=random):
+        """k random memory names of the given kind, with replacement"""
+        names = self._names[kind]
+        return rng.choices(names, k=k) if names else []
+
+    def sample(self, kind, k, rng):
+        """k distinct random memory names of the given kind (numpy Generator)"""
+        names = self._names[kind]
+        k = min(k, len(names))
+        if k <= 0:
+            return []
+        return [names[i] for i in rng.choice(len(names), size=k, replace=False)]
+
+    def _prune_heap(self):
+        heap = self._eviction_heap
+        while heap and heap[0][1] not in self._entries:
+            heapq.heappop(heap)
+
+    def pop_oldest_regular(self, count=1):
+        """Remove and return up to `count` oldest regular memories, oldest first
+
+        Core memories are never in the eviction heap, so they can't be returned.
+        Callers delete the files; the entries are already gone from the index.
+        """
+        evicted = []
+        while len(evicted) < count:
+            self._prune_heap()
+            if not self._eviction_heap:
+                break
+            name = heapq.heappop(self._eviction_heap)[1]
+            evicted.append(self.remove(name))
+        return evicted
+
+    def pop_oldest_regular_bytes(self, nbytes):
+        """Remove the oldest regular memories until at least `nbytes` of storage are freed
+
+        Returns the removed entries, oldest first; fewer bytes are freed only
+        if the regular memories run out.
+        """
+        evicted = []
+        freed = 0
+        while freed < nbytes:
+            self._prune_heap()
+            if not self._eviction_heap:
+                break
+            entry = self.remove(heapq.heappop(self._eviction_heap)[1])
+            evicted.append(entry)
+            freed += entry.allocated
+        return evicted
+
+    def pop_least_intact_bytes(self, nbytes, integrity_of):
+        """Remove the least intact regular memories until at least `nbytes` of storage are freed
+
+        integrity_of(name) is a memory's current integrity (the manifest's).
+        The order is built from it on first call, then kept current by
+        note_integrity; ties go to the oldest memory. Returns the removed
+        entries, least intact first.
+        """
+        if self._integrity_heap is None:
+            self._integrity_of = integrity_of
+            self._build_integrity_heap()
+        heap = self._integrity_heap
+        evicted = []
+        freed = 0
+        while freed < nbytes and heap:
+            integrity, created, name = heapq.heappop(heap)
+            entry = self._entries.get(name)
+            if entry is None or entry.created != created or integrity_of(name) != integrity:
+                continue  # Gone, or superseded by a newer key
+            evicted.append(self.remove(name))
+            freed += entry.allocated
+        return evicted
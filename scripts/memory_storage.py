@@ -0,0 +1,88 @@
+"""
+Storage backends for the memory bank
+
+memory_utils does all of its file I/O through one of these, so where the
+memories physically live is a configuration choice:
+
+- 'directory': one .txt file per memory in memory_bank/ (the original layout)
+- 'segment':   one append-only segment file with an offset index (segment_store)
+- 'fat12':     files inside a 1.44 MB FAT12 floppy image (fat12_store)
+
+Every backend offers the same small set of operations on memory names:
+scan, read, write, rewrite (decay in place), delete and exists. Backends
+whose files can change outside the program (only 'directory') also offer
+stamp(), which the content cache uses to spot stale entries.
+"""
+
+import os
+
+from memory_index import MEMORY_SUFFIX, parse_memory_timestamp
+
+
+class DirectoryStorage:
+    """One file per memory, written atomically via temp file and rename"""
+
+    kind = "directory"
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def scan(self):
+        """Yield (name, size, created) for every memory; one directory pass"""
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(MEMORY_SUFFIX) or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                created = parse_memory_timestamp(entry.name)
+                yield entry.name, stat.st_size, created if created is not None else stat.st_ctime
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def read(self, name):
+        with open(self.path(name), 'rb') as f:
+            return f.read()
+
+    def stamp(self, name):
+        """(mtime, size) of a memory file, to validate cached contents"""
+        stat = os.stat(self.path(name))
+        return stat.st_mtime_ns, stat.st_size
+
+    def write(self, name, data, created=None):
+        path = self.path(name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def rewrite(self, name, data):
+        """Replace a memory's content after decay"""
+        self.write(name, data)
+
+    def delete(self, name):
+        os.remove(self.path(name))
+
+    def describe(self, name):
+        """Human-readable location of a memory, for log messages"""
+        return self.path(name)
+
+    def close(self):
+        pass
+
+
+def create_storage(kind, memory_dir, segment_path=None, image_path=None):
+    """Build the storage backend selected by configuration"""
+    if kind == "directory":
+        return DirectoryStorage(memory_dir)
+    if kind == "segment":
+        from segment_store import SegmentStorage
+        return SegmentStorage(segment_path or os.path.join(memory_dir, "memory_bank.seg"))
+    if kind == "fat12":
+        from fat12_store import Fat12Storage
+        return Fat12Storage(image_path or os.path.join(memory_dir, "floppy.img"))
+    raise ValueError(f"Unknown storage backend: {kind}")
@@ -1,11 +1,357 @@
+import errno
 import os
-import random
+import threading
+import time
 from datetime import datetime
+import memory_codec
+import metrics
+from bank_lock import ReadWriteLock
+from content_cache import ContentCache
+from integrity_manifest import IntegrityManifest
+from memory_index import MemoryIndex, memory_kind
+from memory_storage import create_storage
+from retrieval_index import RetrievalIndex
+from sim_clock import SystemClock
+from weighted_sampler import WeightedSampler
 
-MEMORY_DIR = os.path.join(os.path.dirname(__file__), '../memory_bank')
-MAX_MEMORY_FILES = 100  # Simulated disk quota
+# decay_engine brings in NumPy, most of what importing this module would
+# cost; it is imported inside the functions that use it instead
 
-os.makedirs(MEMORY_DIR, exist_ok=True)
+MEMORY_DIR = os.environ.get("DIGITAL_DECAY_MEMORY_DIR", os.path.join(os.path.dirname(__file__), '../memory_bank'))
+# Simulated disk quota in bytes - a 1.44 MB floppy (80 tracks x 2 sides x 18 x 512)
+MAX_MEMORY_BYTES = int(os.environ.get("DIGITAL_DECAY_QUOTA_BYTES", 1474560))
+
+# Where memories live: 'directory' (one .txt file each in MEMORY_DIR),
+# 'segment' (one append-only segment file, see segment_store.py) or
+# 'fat12' (a 1.44 MB floppy image, see fat12_store.py)
+STORAGE_BACKEND = os.environ.get("DIGITAL_DECAY_STORAGE", "directory")
+SEGMENT_PATH = os.path.join(MEMORY_DIR, "memory_bank.seg")
+FLOPPY_IMAGE_PATH = os.environ.get("DIGITAL_DECAY_FLOPPY_IMAGE", os.path.join(MEMORY_DIR, "floppy.img"))
+
+# How context is chosen each turn: 'random' (random fragments of the past)
+# or 'relevance' (the memories that best match the user's input, BM25)
+RETRIEVAL_MODE = os.environ.get("DIGITAL_DECAY_RETRIEVAL", "random")
+
+# How random context is drawn from the regular memories: 'uniform' (every
+# memory equally likely, repeats possible) or, without repeats, weighted by
+# 'recency', by 'integrity' or by a 'mixed' product of the two
+CONTEXT_SAMPLING = os.environ.get("DIGITAL_DECAY_SAMPLING", "uniform")
+RECENCY_HALF_LIFE_DAYS = 7.0  # A memory this much older is half as likely to surface
+INTEGRITY_EXPONENT = 1.0      # In 'mixed' mode, how strongly decay lowers the odds
+CONTEXT_SEED = None           # Set (or call set_context_seed) for reproducible context
+
+# Optional compression of stored memories: 'none', 'zlib' (deflate primed
+# with a dictionary trained on the bank) or 'lzma', see memory_codec.py.
+# Compressed memories take less of the quota, so more of them fit.
+COMPRESSION = os.environ.get("DIGITAL_DECAY_COMPRESSION", "none")
+CODEC_DICT_DIR = os.path.join(MEMORY_DIR, "codec")
+DICT_TRAIN_MIN_MEMORIES = 50  # Train the zlib dictionary once the bank has this many
+
+# Per-memory integrity (original length, CRC32, share surviving decay) is
+# kept in a sidecar so nothing has to open a memory to know how decayed it is
+MANIFEST_PATH = os.path.join(MEMORY_DIR, "manifest.bin")
+
+# Which memories make room when the disk is full: 'oldest' first, or the
+# most 'decayed' first (oldest among equals)
+EVICTION_POLICY = os.environ.get("DIGITAL_DECAY_EVICTION", "oldest")
+
+# Memory contents kept in RAM between turns (core memories are pinned on
+# top of this once startup is done)
+CONTENT_CACHE_BYTES = 256 * 1024
+
+# Quiet mode drops the sound effects and per-memory chatter (errors still
+# print) - for headless runs such as load_harness.py
+QUIET = os.environ.get("DIGITAL_DECAY_QUIET", "0") == "1"
+
+def _say(message):
+    """Print a progress message unless running quiet"""
+    if not QUIET:
+        print(message)
+
+# ============================================================================
+# STORAGE AND MEMORY INDEX - INDEX BUILT ONCE, THEN KEPT CURRENT
+# ============================================================================
+
+_storage = None
+_memory_index = None
+_retrieval_index = None
+_codec = None
+_manifest = None
+_sampler = None
+_sampler_mode = None
+_sampler_epoch = 0.0
+_sampler_lock = threading.Lock()  # Draws briefly modify the tree; readers run concurrently
+_context_rng = None
+_core_texts = None
+_dict_training_tried = False
+_bank_generation = 0  # Bumped on every change to the bank's contents
+_clock = SystemClock()  # Creation times and ages come from here (see use_clock)
+_index_build_lock = threading.Lock()
+
+# Readers (context loading) share the bank; store, eviction and decay
+# write-back take it exclusively
+bank_lock = ReadWriteLock()
+
+# Contents of recently read memories; content_cache.stats() has the counters
+content_cache = ContentCache(CONTENT_CACHE_BYTES)
+
+# Bank and cache state reported with every metrics flush (see metrics.py)
+metrics.register_gauge("bank_bytes", lambda: _memory_index.total_bytes if _memory_index is not None else 0)
+metrics.register_gauge("bank_memories", lambda: len(_memory_index) if _memory_index is not None else 0)
+metrics.register_gauge("content_cache_hits", lambda: content_cache.hits)
+metrics.register_gauge("content_cache_misses", lambda: content_cache.misses)
+
+def get_storage():
+    """Return the configured storage backend, opening it on first use"""
+    global _storage
+    if _storage is None:
+        with _index_build_lock:
+            if _storage is None:
+                _storage = create_storage(STORAGE_BACKEND, MEMORY_DIR, SEGMENT_PATH, FLOPPY_IMAGE_PATH)
+    return _storage
+
+def use_storage(storage):
+    """Switch the memory layer to another storage backend (drops derived state)"""
+    global _storage, _memory_index, _retrieval_index, _manifest, _sampler, _core_texts, _age_queue
+    global _bank_generation, _initialized
+    with bank_lock.write():
+        _bank_generation += 1
+        if _storage is not None and _storage is not storage:
+            _storage.close()
+        if _manifest is not None:
+            _manifest.close()
+        _storage = storage
+        _memory_index = None
+        _retrieval_index = None
+        _manifest = None
+        _sampler = None
+        _core_texts = None
+        _age_queue = None
+        _initialized = False  # The new bank gets its core memories on first use
+        content_cache.clear()
+
+def use_clock(clock):
+    """Read the time from another clock (a sim_clock.VirtualClock in simulations)
+
+    Memories stored from now on are stamped with its time and age decay
+    measures ages against it. Age decay scheduling is rebuilt around it.
+    """
+    global _clock, _age_queue, _sampler
+    with _decay_lock, bank_lock.write():
+        _clock = clock
+        _age_queue = None
+        _sampler = None
+
+def get_clock():
+    return _clock
+
+def get_memory_index():
+    """Return the bank index, scanning storage on first use only"""
+    global _memory_index
+    if _memory_index is None:
+        storage = get_storage()
+        with _index_build_lock:
+            if _memory_index is None:
+                _memory_index = MemoryIndex.build(storage.scan(), getattr(storage, 'allocated_size', None))
+    return _memory_index
+
+def get_retrieval_index():
+    """Return the relevance index, reading every memory once on first use
+
+    Built under the shared bank lock: a store or decay landing mid-build
+    would otherwise be missed, since _content_changed only updates an index
+    that already exists.
+    """
+    global _retrieval_index
+    if _retrieval_index is None:
+        index = get_memory_index()
+        storage = get_storage()
+        get_codec()  # Decoding below needs it; it can't be opened under the lock
+        with bank_lock.read(), _index_build_lock:
+            if _retrieval_index is None:
+                documents = []
+                for name in index.names():
+                    try:
+                        text = _decode_stored(storage.read(name))
+                        documents.append((name, text.decode('utf-8', errors='ignore')))
+                    except Exception:
+                        continue  # Unreadable now, indexed when next rewritten
+                _retrieval_index = RetrievalIndex.build(documents)
+    return _retrieval_index
+
+def get_manifest():
+    """Return the integrity manifest, reconciled with the bank on first use
+
+    Memories the manifest doesn't know yet (written before it existed) are
+    recorded as intact; entries for memories no longer in the bank are dropped.
+    Reconciled under the shared bank lock, like the retrieval index.
+    """
+    global _manifest
+    if _manifest is None:
+        index = get_memory_index()
+        storage = get_storage()
+        get_codec()  # Decoding below needs it; it can't be opened under the lock
+        with bank_lock.read(), _index_build_lock:
+            if _manifest is None:
+                manifest = IntegrityManifest(MANIFEST_PATH, on_change=index.note_integrity)
+                with manifest.batch():
+                    for name in manifest.names():
+                        if name not in index:
+                            manifest.remove(name)
+                    for name in index.names():
+                        if name not in manifest:
+                            try:
+                                manifest.record(name, _decode_stored(storage.read(name)))
+                            except Exception:
+                                continue
+                _manifest = manifest
+    return _manifest
+
+def get_sampler():
+    """Return the weighted context sampler for CONTEXT_SAMPLING, built on first use"""
+    global _sampler, _sampler_mode, _sampler_epoch
+    if _sampler is None or _sampler_mode != CONTEXT_SAMPLING:
+        index = get_memory_index()
+        get_manifest()
+        with _index_build_lock:
+            if _sampler is None or _sampler_mode != CONTEXT_SAMPLING:
+                _sampler_mode = CONTEXT_SAMPLING
+                _sampler_epoch = _clock.now()
+                _sampler = WeightedSampler.build(
+                    (name, _sampling_weight(name)) for name in index.names('regular'))
+    return _sampler
+
+def _sampling_weight(name):
+    """Weight of a regular memory under CONTEXT_SAMPLING
+
+    Recency is 2^(created - epoch) in half-lives: ratios between memories
+    don't change as time passes, so weights never need refreshing.
+    """
+    weight = 1.0
+    if _sampler_mode in ('recency', 'mixed'):
+        created = _memory_index.get(name).created
+        weight = 2.0 ** ((created - _sampler_epoch) / (RECENCY_HALF_LIFE_DAYS * 24 * 3600))
+    if _sampler_mode == 'integrity':
+        weight *= _manifest.integrity(name)
+    elif _sampler_mode == 'mixed':
+        weight *= _manifest.integrity(name) ** INTEGRITY_EXPONENT
+    return weight
+
+def set_context_seed(seed):
+    """Reseed the generator behind weighted context sampling"""
+    global _context_rng
+    import decay_engine
+    _context_rng = decay_engine.make_rng(seed)
+
+def _get_context_rng():
+    global _context_rng
+    if _context_rng is None:
+        import decay_engine
+        _context_rng = decay_engine.make_rng(CONTEXT_SEED)
+    return _context_rng
+
+def _sample_regular(index, k, exclude=()):
+    """k regular memories per CONTEXT_SAMPLING, none of them in `exclude`"""
+    if CONTEXT_SAMPLING == 'uniform':
+        return [name for name in index.choices('regular', k=k) if name not in exclude]
+    if CONTEXT_SAMPLING not in ('recency', 'integrity', 'mixed'):
+        raise ValueError(f"Unknown context sampling: {CONTEXT_SAMPLING}")
+    sampler = get_sampler()
+    with _sampler_lock:
+        picked = sampler.sample(k + len(exclude), _get_context_rng())
+    return [name for name in picked if name not in exclude][:k]
+
+def get_memory_integrity(name):
+    """Manifest entry (original length, CRC32, integrity...) of a memory, or None"""
+    return get_manifest().get(name)
+
+def _index_written(filename, stored, data):
+    """Keep already-built indexes in step with a new file (stored and plain bytes)"""
+    if _memory_index is not None:
+        _memory_index.add(filename, len(stored), _clock.now())
+    _content_changed(filename, data)
+
+def get_codec():
+    """Return the memory codec, loading any trained dictionaries on first use"""
+    global _codec
+    if _codec is None:
+        with _index_build_lock:
+            if _codec is None:
+                _codec = memory_codec.MemoryCodec(COMPRESSION, CODEC_DICT_DIR)
+    return _codec
+
+def _decode_stored(blob):
+    """Plain bytes of a memory as read from storage"""
+    return get_codec().decode(blob)
+
+def _decode_damaged(blob):
+    """Plain bytes of a memory being decayed, or None if its header no longer decodes
+
+    Flipped bits in the compressed header (codec or dictionary id) leave
+    nothing a codec can read; decay then treats the stored bytes as opaque.
+    """
+    try:
+        return get_codec().decode(blob)
+    except memory_codec.CodecError:
+        return None
+
+def train_compression_dictionary(sample_size=200):
+    """Train a new shared zlib dictionary from a sample of the bank"""
+    with bank_lock.write():
+        return _train_dictionary_locked(get_memory_index(), sample_size)
+
+def _train_dictionary_locked(index, sample_size):
+    global _dict_training_tried
+    _dict_training_tried = True
+    storage = get_storage()
+    names = index.names('core') + index.sample('regular', sample_size, _get_decay_rng())
+    samples = []
+    for name in names:
+        try:
+            samples.append(_decode_stored(storage.read(name)).decode('utf-8', errors='ignore'))
+        except Exception:
+            continue
+    dict_id = get_codec().train(samples)
+    _say(f"💾 Trained compression dictionary {dict_id} from {len(samples)} memories 💾")
+    return dict_id
+
+def bank_generation():
+    """Counter that changes whenever a memory is stored, decayed or removed
+
+    Anything computed from the bank (a prefetched context, say) is still
+    current if the generation hasn't moved since it was computed.
+    """
+    return _bank_generation
+
+def _content_changed(filename, data):
+    """A memory was written or decayed: refresh what's derived from its content"""
+    global _sampler, _core_texts, _bank_generation
+    _bank_generation += 1
+    content_cache.invalidate(filename)
+    if memory_kind(filename) == 'core':
+        _core_texts = None
+    if _retrieval_index is not None:
+        _retrieval_index.update(filename, data.decode('utf-8', errors='ignore'))
+    if _sampler is not None and memory_kind(filename) == 'regular':
+        weight = _sampling_weight(filename)
+        if weight > 1e250:
+            _sampler = None  # Centuries past the epoch: rebuild around a new one
+        else:
+            _sampler.set(filename, weight)
+
+def _content_removed(filename):
+    """A memory is gone: forget what's derived from its content"""
+    global _core_texts, _bank_generation
+    _bank_generation += 1
+    content_cache.invalidate(filename)
+    if memory_kind(filename) == 'core':
+        _core_texts = None
+    if _retrieval_index is not None:
+        _retrieval_index.remove(filename)
+    if _manifest is not None:
+        _manifest.remove(filename)
+    if _sampler is not None:
+        _sampler.remove(filename)
 
 # ============================================================================
 # MEMORY PRIORITIZATION SYSTEM - CORE IDENTITY PRESERVATION
@@ -33,66 +379,206 @@ CORE_MEMORIES = {
     ]
 }
 
+_core_manifest = None  # [(filename, content)] for CORE_MEMORIES, built once
+
+def get_core_manifest():
+    """The core memory files the bank should hold, as (filename, content) pairs"""
+    global _core_manifest
+    if _core_manifest is None:
+        _core_manifest = [(f"core_{category}_{i:02d}.txt", f"AI: {memory}".encode('utf-8'))
+                          for category, memories in CORE_MEMORIES.items()
+                          for i, memory in enumerate(memories)]
+    return _core_manifest
+
 def store_core_memories():
     """Store core identity memories that should be preserved"""
-    for category, memories in CORE_MEMORIES.items():
-        for i, memory in enumerate(memories):
-            filename = f"core_{category}_{i:02d}.txt"
-            filepath = os.path.join(MEMORY_DIR, filename)
-            
-            # Only create if it doesn't exist
-            if not os.path.exists(filepath):
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(f"AI: {memory}")
-                print(f"💾 Stored core memory: {filename}")
-
-def load_memories_with_priority(n=3):
-    """Load memories with priority for core identity"""
-    simulate_floppy_sounds('read')
-    
-    files = [f for f in os.listdir(MEMORY_DIR) if f.endswith('.txt')]
-    if not files:
-        print("💾 No memories found on disk 💾")
-        return ""
-    
-    # Separate core and regular memories
-    core_files = [f for f in files if f.startswith('core_')]
-    regular_files = [f for f in files if not f.startswith('core_')]
+    index = get_memory_index()
+    # The index already knows which files exist, so no per-file stat
+    if all(filename in index for filename, _ in get_core_manifest()):
+        return
+    with bank_lock.write():
+        _store_core_memories_locked(index)
+
+def _store_core_memories_locked(index):
+    storage = get_storage()
+    for filename, content in get_core_manifest():
+        # Only create if it doesn't exist
+        if filename not in index:
+            stored = get_codec().encode(content)
+            storage.write(filename, stored)
+            _index_written(filename, stored, content)
+            get_manifest().record(filename, content)
+            _say(f"💾 Stored core memory: {filename}")
+
+def load_memories_with_priority(n=3, query=None, mode=None):
+    """Load memories with priority for core identity
+
+    In 'relevance' mode (see RETRIEVAL_MODE) the memories that best match
+    `query` are chosen; without a query, or for slots no memory matches,
+    selection falls back to random.
+    """
+    ensure_initialized()
+    with metrics.span("context_load"):
+        simulate_floppy_sounds('read')
+    
+        index = get_memory_index()
+        query = _retrieval_query(query, mode)
+        with bank_lock.read():
+            context, missing = _load_memories_locked(index, n, query)
+        _forget_missing(index, missing)
+        return context
+
+def load_memory_fragments(k, query=None, mode=None, quiet=False):
+    """Up to k regular memories as separate text fragments (no core memory)
+
+    Selection works as in load_memories_with_priority; unreadable memories
+    come back as the same corruption markers. `quiet` skips the read sound
+    (for loads done in the background).
+    """
+    ensure_initialized()
+    with metrics.span("context_load"):
+        if not quiet:
+            simulate_floppy_sounds('read')
+    
+        index = get_memory_index()
+        query = _retrieval_query(query, mode)
+        missing = []
+        with bank_lock.read():
+            fragments = _read_regular_locked(index, k, query, missing)
+        _forget_missing(index, missing)
+        return fragments
+
+def get_core_memories():
+    """Text of every core memory in name order - the same list every turn
+
+    Core memories never decay, so the list is built once and only rebuilt
+    if one of them is rewritten or removed.
+    """
+    global _core_texts
+    ensure_initialized()
+    texts = _core_texts
+    if texts is None:
+        index = get_memory_index()
+        with bank_lock.read():
+            texts = []
+            for name in sorted(index.names('core')):
+                try:
+                    texts.append(_read_memory_text(name))
+                except Exception as e:
+                    texts.append(f"[CORRUPTED CORE MEMORY - {str(e)[:30]}]")
+        _core_texts = texts
+    return list(texts)
+
+def _retrieval_query(query, mode):
+    """The query to rank memories by, or None for random selection"""
+    mode = mode or RETRIEVAL_MODE
+    if mode not in ('random', 'relevance'):
+        raise ValueError(f"Unknown retrieval mode: {mode}")
+    return query if mode == 'relevance' else None
+
+def _forget_missing(index, missing):
+    """Forget memories that vanished from disk behind our back"""
+    if missing:
+        with bank_lock.write():
+            for name in missing:
+                index.remove(name)
+                _content_removed(name)
+
+def _read_memory_bytes(name):
+    """Read one memory through the content cache"""
+    storage = get_storage()
+    # Directory files can be edited behind our back, so validate by mtime and
+    # size; other backends only change through us and invalidate explicitly
+    stamp = storage.stamp(name) if hasattr(storage, 'stamp') else None
+    data = content_cache.get(name, stamp)
+    if data is None:
+        stored = storage.read(name)
+        metrics.incr("files_read")
+        metrics.incr("bytes_read", len(stored))
+        data = _decode_stored(stored)
+        content_cache.put(name, data, stamp)
+    return data
+
+def _read_memory_text(name):
+    """Read one memory as text (raises UnicodeDecodeError on a mangled block)"""
+    return _read_memory_bytes(name).decode('utf-8')
+
+def pin_core_memories():
+    """Hold the core memories in the content cache for good (they never decay)
+
+    They are read on first use (every context starts with them), not here.
+    """
+    for name in get_memory_index().names('core'):
+        content_cache.pin(name)
+
+# Share of a memory's relevance score that depends on its integrity: with
+# 0.5 a half-decayed memory ranks as if three quarters as relevant
+INTEGRITY_WEIGHTING = 0.5
+
+def _select_relevant(query, kind, k):
+    """Up to k memories of one kind ranked by relevance to the query"""
+    manifest = get_manifest()
+    ranked = get_retrieval_index().top_k(
+        query, k,
+        accept=lambda name: memory_kind(name) == kind,
+        weight=lambda name: 1.0 - INTEGRITY_WEIGHTING * (1.0 - manifest.integrity(name)),
+    )
+    return [name for name, _ in ranked]
+
+def _load_memories_locked(index, n, query=None):
+    """Build the context string; returns it with any names found missing"""
+    missing = []
+    if not len(index):
+        _say("💾 No memories found on disk 💾")
+        return "", missing
     
     context = ""
+    has_core = index.count('core') > 0
     
     # Always include at least 1 core memory (identity preservation)
-    if core_files:
-        selected_core = random.choice(core_files)
+    if has_core:
+        relevant_core = _select_relevant(query, 'core', 1) if query else []
+        selected_core = relevant_core[0] if relevant_core else index.choose('core')
         try:
-            with open(os.path.join(MEMORY_DIR, selected_core), 'r', encoding='utf-8') as f:
-                content = f.read()
-                context += content + "\n"
+            content = _read_memory_text(selected_core)
+            context += content + "\n"
         except Exception as e:
             context += f"[CORRUPTED CORE MEMORY - {str(e)[:30]}]\n"
             simulate_floppy_sounds('error')
     
     # Fill remaining slots with regular memories
-    remaining_slots = n - 1 if core_files else n
-    if regular_files and remaining_slots > 0:
-        selected_regular = random.choices(regular_files, k=min(remaining_slots, len(regular_files)))
-        
-        for file in selected_regular:
-            try:
-                with open(os.path.join(MEMORY_DIR, file), 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    context += content + "\n"
-            except UnicodeDecodeError:
-                context += "[CORRUPTED MEMORY BLOCK - ENCODING ERROR]\n"
-                simulate_floppy_sounds('error')
-            except FileNotFoundError:
-                context += "[MISSING MEMORY BLOCK]\n"
-                simulate_floppy_sounds('error')
-            except Exception as e:
-                context += f"[CORRUPTED MEMORY BLOCK - {str(e)[:30]}]\n"
-                simulate_floppy_sounds('error')
+    remaining_slots = n - 1 if has_core else n
+    for fragment in _read_regular_locked(index, remaining_slots, query, missing):
+        context += fragment + "\n"
     
-    return context.strip()
+    return context.strip(), missing
+
+def _read_regular_locked(index, k, query, missing):
+    """Select up to k regular memories and read them as text fragments"""
+    regular_count = index.count('regular')
+    if not regular_count or k <= 0:
+        return []
+    k = min(k, regular_count)
+    selected_regular = _select_relevant(query, 'regular', k) if query else []
+    if len(selected_regular) < k:
+        # Top up with random fragments when too few memories match
+        selected_regular += _sample_regular(index, k - len(selected_regular), set(selected_regular))
+    
+    fragments = []
+    for file in selected_regular:
+        try:
+            fragments.append(_read_memory_text(file))
+        except UnicodeDecodeError:
+            fragments.append("[CORRUPTED MEMORY BLOCK - ENCODING ERROR]")
+            simulate_floppy_sounds('error')
+        except FileNotFoundError:
+            fragments.append("[MISSING MEMORY BLOCK]")
+            simulate_floppy_sounds('error')
+            missing.append(file)
+        except Exception as e:
+            fragments.append(f"[CORRUPTED MEMORY BLOCK - {str(e)[:30]}]")
+            simulate_floppy_sounds('error')
+    return fragments
 
 # ============================================================================
 # ARTISTIC SIMULATION FEATURES - REMOVE WHEN USING REAL FLOPPY HARDWARE
@@ -107,127 +593,433 @@ def simulate_floppy_sounds(operation):
         'full': "💾 *disk full warning* 💾",
         'corrupt': "💾 *data corruption noise* 💾"
     }
-    print(sounds.get(operation, "💾 *floppy operation* 💾"))
+    _say(sounds.get(operation, "💾 *floppy operation* 💾"))
 
-def simulate_memory_decay():
-    """Artistically corrupt some memory files - REMOVE FOR REAL HARDWARE"""
-    files = [f for f in os.listdir(MEMORY_DIR) if f.endswith('.txt')]
-    if not files:
-        return
+# Decay RNG: set DECAY_SEED (or call set_decay_seed) for reproducible runs
+DECAY_SEED = None
+_decay_rng = None
+
+def set_decay_seed(seed):
+    """Reseed the decay generator - REMOVE FOR REAL HARDWARE"""
+    global _decay_rng
+    import decay_engine
+    _decay_rng = decay_engine.make_rng(seed)
+
+def _get_decay_rng(rng=None):
+    global _decay_rng
+    if rng is not None:
+        return rng
+    if _decay_rng is None:
+        import decay_engine
+        _decay_rng = decay_engine.make_rng(DECAY_SEED)
+    return _decay_rng
+
+def _read_for_decay(filenames):
+    """Read the chosen memories as stored, skipping any that fail"""
+    storage = get_storage()
+    names, buffers = [], []
+    for filename in filenames:
+        try:
+            buffers.append(storage.read(filename))
+            names.append(filename)
+        except Exception as e:
+            print(f"💾 Decay read failed: {e} 💾")
+    metrics.incr("files_read", len(buffers))
+    metrics.incr("bytes_read", sum(len(b) for b in buffers))
+    return names, buffers
+
+def _write_decayed(filename, stored, data, survived):
+    """Write a decayed memory back and record its new size (caller holds the write lock)"""
+    get_storage().rewrite(filename, stored)
+    metrics.incr("bytes_written", len(stored))
+    get_memory_index().update_size(filename, len(stored))
+    get_manifest().update(filename, data, survived)
+    _content_changed(filename, data)
+
+def _decay_stored(names, blobs, rates, rng):
+    """Decay memories as stored; returns (stored, plain, bytes_lost, survived) for each
+
+    Plain memories, and compressed ones in 'text' mode, lose characters of
+    their text; in 'bytes' mode compressed memories lose bytes of the
+    compressed stream instead (the header is spared so the codec is known).
+    """
+    import decay_engine
+    codec = get_codec()
+    results = [None] * len(blobs)
+    by_bytes = [COMPRESSED_DECAY == 'bytes' and memory_codec.is_encoded(b) for b in blobs]
+    
+    text_items = [i for i, raw in enumerate(by_bytes) if not raw]
+    texts = [_decode_damaged(blobs[i]) for i in text_items]
+    opaque = [text is None for text in texts]
+    texts = [blobs[i] if text is None else text for i, text in zip(text_items, texts)]
+    decayed = decay_engine.decay_batch(texts, [rates[names[i]] for i in text_items], rng)
+    for i, text, kept, damaged in zip(text_items, texts, decayed, opaque):
+        survived = len(kept) / len(text) if text else 1.0
+        if len(kept) == len(text):
+            results[i] = (blobs[i], text, 0, 1.0)
+        elif memory_codec.is_encoded(blobs[i]) and not damaged:
+            results[i] = (codec.encode(kept), kept, len(text) - len(kept), survived)
+        else:
+            results[i] = (kept, kept, len(text) - len(kept), survived)
+    
+    byte_items = [i for i, raw in enumerate(by_bytes) if raw]
+    bodies = [blobs[i][memory_codec.HEADER_SIZE:] for i in byte_items]
+    decayed = decay_engine.decay_batch(bodies, [rates[names[i]] for i in byte_items], rng, utf8=False)
+    for i, body, kept in zip(byte_items, bodies, decayed):
+        stored = blobs[i][:memory_codec.HEADER_SIZE] + kept
+        survived = len(kept) / len(body) if body else 1.0
+        data = _decode_damaged(stored)
+        results[i] = (stored, stored if data is None else data, len(body) - len(kept), survived)
+    return results
+
+# Random decay: chance per sweep that a memory is hit, and share of it lost
+RANDOM_DECAY_CHANCE = 0.05
+RANDOM_DECAY_RATE = 0.1
+
+# On storage that exposes raw sectors (the FAT12 image), decay can flip bits
+# in a memory's sectors instead of dropping characters
+RAW_SECTOR_DECAY = os.environ.get("DIGITAL_DECAY_RAW_SECTORS", "0") == "1"
+
+# How decay treats compressed memories: 'text' decays the decoded text and
+# re-encodes it; 'bytes' drops bytes of the compressed stream itself, so one
+# lost byte can garble everything after it
+COMPRESSED_DECAY = os.environ.get("DIGITAL_DECAY_COMPRESSED_DECAY", "text")
+
+# Age decay is event driven: every regular memory has a "next due" tick in
+# this queue and an age pass only touches the memories that come due
+_age_queue = None
+_decay_lock = threading.Lock()  # One sweep at a time (queue and RNG state)
+
+def _get_age_queue(index, rng):
+    """Build the age decay queue on first use, scheduling every regular memory"""
+    global _age_queue
+    if _age_queue is None:
+        import decay_engine
+        queue = decay_engine.DecayQueue()
+        now = _clock.now()
+        names = index.names('regular')
+        queue.schedule_many(names, [(now - index.get(name).created) / (24 * 3600) for name in names], rng)
+        _age_queue = queue
+    return _age_queue
+
+def _select_for_decay(index, random_decay, age_decay, rng):
+    """Pick this sweep's victims; returns ({name: rate}, {name: age_days}, random_hits)"""
+    import decay_engine
+    rates = {}
+    ages = {}
+    random_hits = set()
+    
+    # Simulate random corruption: draw how many memories are hit, then which
+    # ones, instead of rolling a die per memory
+    if random_decay:
+        hits = int(rng.binomial(index.count('regular'), RANDOM_DECAY_CHANCE))
+        for name in index.sample('regular', hits, rng):
+            rates[name] = RANDOM_DECAY_RATE
+            random_hits.add(name)
+    
+    # Older memories have higher corruption chance and lose more content.
+    # Age comes from the recorded creation time (ctime is reset every time
+    # decay rewrites the file).
+    if age_decay:
+        queue = _get_age_queue(index, rng)
+        now = _clock.now()
+        due = [(name, decays) for name, decays in queue.advance() if name in index]  # Skip evicted
+        names = [name for name, _ in due]
+        age_days = [(now - index.get(name).created) / (24 * 3600) for name in names]
+        # Memories decayed down to nothing have nothing left to lose
+        hit = [i for i, (name, decays) in enumerate(due) if decays and index.get(name).size]
+        if hit:
+            # Rates for all of this pass's victims in one vectorized step
+            hit_ages = [age_days[i] for i in hit]
+            age_rates = decay_engine.age_decay_rate(hit_ages)
+            earlier = [rates.get(names[i], 0.0) for i in hit]
+            combined = decay_engine.combine_rates(earlier, age_rates).tolist()
+            for i, age, rate in zip(hit, hit_ages, combined):
+                ages[names[i]] = age
+                rates[names[i]] = rate
+        queue.schedule_many(names, age_days, rng)
+    return rates, ages, random_hits
+
+def decay_sweep(random_decay=True, age_decay=True, rng=None):
+    """Apply random and age-based decay in one pass - REMOVE FOR REAL HARDWARE
+
+    Only memories picked by a policy are touched, so the cost scales with
+    the number of memories that decay, not with the size of the bank. Each
+    is read at most once and written only if it actually lost bytes.
+    Selection and reads happen under the shared bank lock and the decay
+    itself under no lock; only the write-back is exclusive, so a sweep
+    barely delays a concurrent turn. Returns a DecayReport.
+    """
+    import decay_engine
+    start = time.perf_counter()
+    rng = _get_decay_rng(rng)
+    index = get_memory_index()
+    report = decay_engine.DecayReport()
     
-    # Only corrupt regular memories, preserve core memories
-    regular_files = [f for f in files if not f.startswith('core_')]
+    storage = get_storage()
+    raw_sectors = RAW_SECTOR_DECAY and hasattr(storage, 'corrupt_sectors')
     
-    # Simulate random corruption (5% chance per file)
-    for filename in regular_files:
-        if random.random() < 0.05:  # 5% corruption chance
-            filepath = os.path.join(MEMORY_DIR, filename)
+    with _decay_lock:
+        with bank_lock.read():
+            report.bank_size = index.count('regular')
+            # Only decay regular memories, preserve core memories
+            rates, ages, random_hits = _select_for_decay(index, random_decay, age_decay, rng)
+            report.files_scanned = len(rates)
+            if not raw_sectors:
+                names, buffers = _read_for_decay(rates)
+        
+        if raw_sectors:
+            # Damage the sectors in place; nothing needs reading first
+            with bank_lock.write():
+                written = _corrupt_sectors_locked(storage, index, rates, rng, report)
+        else:
+            decayed = _decay_stored(names, buffers, rates, rng)
+            with bank_lock.write():
+                written = _write_back_locked(index, names, buffers, decayed)
+    
+    for filename, removed in written:
+        report.files_corrupted += 1
+        report.bytes_removed += removed
+        if filename in random_hits:
+            simulate_floppy_sounds('corrupt')
+            _say(f"💾 Memory corrupted: {filename} 💾")
+        if filename in ages:
+            _say(f"💾 Aged memory decay: {filename} (age: {ages[filename]:.1f} days) 💾")
+    
+    report.elapsed = time.perf_counter() - start
+    metrics.observe("decay_sweep", report.elapsed)
+    metrics.incr("corruptions", report.files_corrupted)
+    metrics.incr("decay_bytes_lost", report.bytes_removed)
+    return report
+
+def _write_back_locked(index, names, originals, decayed):
+    """Write decayed memories that lost bytes; returns [(name, bytes_removed)]"""
+    written = []
+    with get_manifest().batch():  # One journal write for the whole sweep
+        for filename, original, (stored, data, removed, survived) in zip(names, originals, decayed):
+            if not removed:
+                continue  # Nothing lost, leave the file alone
+            entry = index.get(filename)
+            if entry is None or entry.size != len(original):
+                continue  # Evicted or rewritten since we read it
             try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # Simulate partial corruption by replacing random characters
-                corrupted = ''.join(
-                    c if random.random() > 0.1 else '' 
-                    for c in content
-                )
-                
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(corrupted)
-                
-                simulate_floppy_sounds('corrupt')
-                print(f"💾 Memory corrupted: {filename} 💾")
+                _write_decayed(filename, stored, data, survived)
             except Exception as e:
-                print(f"💾 Corruption simulation failed: {e} 💾")
+                print(f"💾 Decay simulation failed: {e} 💾")
+                continue
+            written.append((filename, removed))
+    return written
 
-def age_memories_over_time():
-    """Gradually corrupt older memories - REMOVE FOR REAL HARDWARE"""
-    files = [f for f in os.listdir(MEMORY_DIR) if f.endswith('.txt')]
-    # Only age regular memories, preserve core memories
-    regular_files = [f for f in files if not f.startswith('core_')]
-    
-    for filename in regular_files:
-        filepath = os.path.join(MEMORY_DIR, filename)
+def _corrupt_sectors_locked(storage, index, rates, rng, report):
+    """Raw sector decay for the chosen memories; returns [(name, bytes_removed)]"""
+    written = []
+    for filename, rate in rates.items():
+        if filename not in index:
+            continue
         try:
-            # Calculate age of memory file
-            creation_time = os.path.getctime(filepath)
-            age_days = (datetime.now().timestamp() - creation_time) / (24 * 3600)
-            
-            # Older memories have higher corruption chance
-            corruption_chance = min(0.02 + (age_days * 0.01), 0.3)
-            
-            if random.random() < corruption_chance:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # Age-based corruption: replace more content for older files
-                corruption_rate = min(0.05 + (age_days * 0.02), 0.4)
-                corrupted = ''.join(
-                    c if random.random() > corruption_rate else '' 
-                    for c in content
-                )
-                
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(corrupted)
-                
-                print(f"💾 Aged memory decay: {filename} (age: {age_days:.1f} days) 💾")
+            flipped = storage.corrupt_sectors(filename, rate, rng)
         except Exception as e:
-            print(f"💾 Age simulation failed: {e} 💾")
+            print(f"💾 Sector decay failed: {e} 💾")
+            continue
+        if flipped:
+            report.bytes_flipped += flipped
+            written.append((filename, 0))
+            stored = storage.read(filename)
+            data = _decode_damaged(stored)
+            if data is None:
+                data = stored
+            size = index.get(filename).size
+            get_manifest().update(filename, data, 1.0 - flipped / size if size else 1.0)
+            _content_changed(filename, data)
+    return written
+
+def simulate_memory_decay(rng=None):
+    """Artistically corrupt some memory files - REMOVE FOR REAL HARDWARE"""
+    return decay_sweep(random_decay=True, age_decay=False, rng=rng)
+
+def age_memories_over_time(rng=None):
+    """Gradually corrupt older memories - REMOVE FOR REAL HARDWARE"""
+    return decay_sweep(random_decay=False, age_decay=True, rng=rng)
 
 # ============================================================================
 # END ARTISTIC SIMULATION FEATURES
 # ============================================================================
 
 def store_memory_block(text):
-    # Simulate floppy disk write operation
-    simulate_floppy_sounds('write')
+    ensure_initialized()
+    with metrics.span("memory_store"):
+        # Simulate floppy disk write operation
+        simulate_floppy_sounds('write')
     
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    filename = os.path.join(MEMORY_DIR, f"mem_{timestamp}.txt")
+        index = get_memory_index()
+        storage = get_storage()
+        data = text.encode('utf-8')
     
-    try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(text)
-        print(f"💾 Memory stored: {filename} 💾")
-    except Exception as e:
-        simulate_floppy_sounds('error')
-        print(f"💾 Write error: {e} 💾")
-        return
-
-    # Simulate disk space management (like real floppy behavior)
-    files = [f for f in os.listdir(MEMORY_DIR) if f.endswith('.txt')]
-    if len(files) > MAX_MEMORY_FILES:
-        simulate_floppy_sounds('full')
-        print("💾 *disk full warning beep* 💾")
+        # The quota check, eviction and the write form one exclusive step, so
+        # concurrent stores can't both see an over-full bank and race on eviction
+        with bank_lock.write():
+            name = _unique_memory_name(index)
+            filename = storage.describe(name)
+        
+            codec = get_codec()
+            if (codec.kind == 'zlib' and not codec.has_dictionary and not _dict_training_tried
+                    and index.count('regular') >= DICT_TRAIN_MIN_MEMORIES):
+                _train_dictionary_locked(index, 200)
+            stored = codec.encode(data)
+        
+            # Simulate disk space management (like real floppy behavior): make
+            # exactly enough room for this block by overwriting the oldest
+            # memories. Space is counted the way the storage allocates it.
+            quota = _quota()
+            needed = index.charge(len(stored))
+            if needed > quota - index.allocated('core'):
+                simulate_floppy_sounds('error')
+                print(f"💾 Write error: memory block of {len(stored)} bytes will never fit on the disk 💾")
+                return
+            overflow = index.allocated() + needed - quota
+            if overflow > 0:
+                simulate_floppy_sounds('full')
+                _say("💾 *disk full warning beep* 💾")
+                _evict_locked(_pop_for_eviction(index, overflow))
         
-        # Remove oldest regular memory (preserve core memories)
-        regular_files = [f for f in files if not f.startswith('core_')]
-        if regular_files:
-            oldest = min(regular_files, key=lambda f: os.path.getctime(os.path.join(MEMORY_DIR, f)))
             try:
-                os.remove(os.path.join(MEMORY_DIR, oldest))
-                print(f"💾 Overwrote old memory: {oldest} 💾")
+                _write_evicting(storage, index, name, stored, needed)
+                metrics.incr("memories_stored")
+                metrics.incr("bytes_written", len(stored))
+                index.add(name, len(stored))
+                get_manifest().record(name, data)
+                _content_changed(name, data)
+                if _age_queue is not None:
+                    _age_queue.schedule(name, 0.0, _get_decay_rng())
+                _say(f"💾 Memory stored: {filename} 💾")
             except Exception as e:
-                print(f"💾 Overwrite error: {e} 💾")
+                simulate_floppy_sounds('error')
+                print(f"💾 Write error: {e} 💾")
+                return
+
+def _write_evicting(storage, index, name, stored, needed):
+    """Write a new memory, overwriting older ones while the storage reports it full
+
+    The quota normally leaves room; this covers what it can't see, such as a
+    directory that had to grow or an image shared with other files.
+    """
+    while True:
+        try:
+            storage.write(name, stored)
+            return
+        except OSError as e:
+            if e.errno != errno.ENOSPC:
+                raise
+            used = index.allocated()
+            simulate_floppy_sounds('full')
+            _say("💾 *disk full warning beep* 💾")
+            _evict_locked(_pop_for_eviction(index, needed))
+            if index.allocated() >= used:
+                raise  # Nothing left to overwrite
+
+def _quota():
+    """MAX_MEMORY_BYTES, or what the storage can hold if that is less"""
+    storage = get_storage()
+    if hasattr(storage, 'capacity'):
+        return min(MAX_MEMORY_BYTES, storage.capacity())
+    return MAX_MEMORY_BYTES
+
+def _unique_memory_name(index):
+    """mem_<timestamp>.txt for the clock's current time, unused in the bank
+
+    Names carry the creation time and must not collide; when several stores
+    share a timestamp (a coarse or virtual clock) later ones move forward a
+    microsecond at a time.
+    """
+    micros = int(round(_clock.now() * 1_000_000))
+    while True:
+        stamp = datetime.fromtimestamp(micros // 1_000_000).replace(microsecond=micros % 1_000_000)
+        name = f"mem_{stamp.strftime('%Y%m%d_%H%M%S_%f')}.txt"
+        if name not in index:
+            return name
+        micros += 1
+
+def get_disk_usage():
+    """(bytes used, quota in bytes) - O(1), from the running index totals
+
+    Both are in the storage's allocation units (whole clusters on the FAT12
+    image), so a full disk reads as full.
+    """
+    ensure_initialized()
+    return get_memory_index().allocated(), _quota()
+
+def evict_oldest_memories(count):
+    """Delete the `count` oldest regular memories (core memories are never evicted)"""
+    index = get_memory_index()
+    with bank_lock.write():
+        _evict_locked(index.pop_oldest_regular(count))
+
+def evict_bytes(nbytes):
+    """Delete regular memories (per EVICTION_POLICY) until at least `nbytes` are freed"""
+    index = get_memory_index()
+    with bank_lock.write():
+        _evict_locked(_pop_for_eviction(index, nbytes))
+
+def _pop_for_eviction(index, nbytes):
+    """Take memories freeing at least `nbytes` out of the index, per EVICTION_POLICY"""
+    if EVICTION_POLICY == 'oldest':
+        return index.pop_oldest_regular_bytes(nbytes)
+    if EVICTION_POLICY != 'decayed':
+        raise ValueError(f"Unknown eviction policy: {EVICTION_POLICY}")
+    # Least intact first, from the manifest - no memory has to be opened
+    return index.pop_least_intact_bytes(nbytes, get_manifest().integrity)
+
+def _evict_locked(entries):
+    """Delete memories already taken out of the index (caller holds the write lock)"""
+    index = get_memory_index()
+    for entry in entries:
+        if _age_queue is not None:
+            _age_queue.discard(entry.name)
+        try:
+            get_storage().delete(entry.name)
+            _content_removed(entry.name)
+            metrics.incr("evictions")
+            _say(f"💾 Overwrote old memory: {entry.name} 💾")
+        except FileNotFoundError:
+            _content_removed(entry.name)
+        except Exception as e:
+            # Keep indexing a file we failed to delete so it is retried later
+            index.add(entry.name, entry.size, entry.created)
+            print(f"💾 Overwrite error: {e} 💾")
 
 def load_random_memories(n=3):
     """Legacy function - now uses prioritized loading"""
-    return load_memories_with_priority(n)
+    return load_memories_with_priority(n, mode='random')
 
 # ============================================================================
 # ARTISTIC SIMULATION INITIALIZATION - REMOVE FOR REAL HARDWARE
 # ============================================================================
 
+_initialized = False
+_init_lock = threading.Lock()
+
 def initialize_artistic_simulation():
     """Initialize artistic decay simulation - REMOVE FOR REAL HARDWARE"""
-    print("🎨 Initializing artistic floppy disk simulation...")
-    print("💾 Simulated features: sound effects, memory decay, age-based corruption")
-    print("💾 Core identity memories will be preserved")
-    print("💾 REMOVE THESE FEATURES WHEN USING REAL FLOPPY HARDWARE")
-    print("=" * 60)
+    _say("🎨 Initializing artistic floppy disk simulation...")
+    _say("💾 Simulated features: sound effects, memory decay, age-based corruption")
+    _say("💾 Core identity memories will be preserved")
+    _say("💾 REMOVE THESE FEATURES WHEN USING REAL FLOPPY HARDWARE")
+    _say("=" * 60)
     
     # Initialize core memories
     store_core_memories()
+    pin_core_memories()
+
+def ensure_initialized():
+    """Run initialize_artistic_simulation once per bank
 
-# Call initialization when module is imported
-initialize_artistic_simulation()
+    Importing this module touches no files; the bank is opened and the core
+    memories written on first use (any load or store calls this), or
+    up front by calling it directly.
+    """
+    global _initialized
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                initialize_artistic_simulation()
+                _initialized = True
@@ -0,0 +1,240 @@
+"""
+Turn instrumentation - spans, counters and gauges with a file exporter
+
+    with metrics.span("context_load"):
+        ...
+    metrics.incr("files_read")
+    metrics.incr("bytes_read", len(data))
+
+Spans time a block on the monotonic clock (count, sum, max and histogram
+buckets per name); counters only go up; gauges are read from callbacks
+when the metrics are written out. A background thread writes everything
+every METRICS_FLUSH_SECONDS, either as a Prometheus text file (for
+node_exporter's textfile collector, rewritten atomically) or as one JSON
+line per flush.
+
+Off unless DIGITAL_DECAY_METRICS is 'prometheus' or 'jsonl' (or configure()
+is called). When off, span() hands back one shared no-op context manager
+and incr() returns straight away, so instrumented code pays a function call
+and a flag check.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+METRICS_FORMAT = os.environ.get("DIGITAL_DECAY_METRICS", "")     # '', 'prometheus' or 'jsonl'
+METRICS_FILE = os.environ.get("DIGITAL_DECAY_METRICS_FILE")      # Default: logs/metrics.prom|jsonl
+METRICS_FLUSH_SECONDS = float(os.environ.get("DIGITAL_DECAY_METRICS_FLUSH", 10))
+METRICS_PREFIX = "digital_decay"
+
+# Span histogram bucket bounds in seconds (Prometheus 'le' labels)
+SPAN_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+LOG_DIR = os.path.join(os.path.dirname(__file__), '../logs')
+
+_enabled = False
+_lock = threading.Lock()
+_counters = {}
+_spans = {}             # name -> [count, sum, max, bucket counts...]
+_gauges = {}            # name -> callable
+_exporter = None
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def enabled():
+    return _enabled
+
+
+def span(name):
+    """Context manager timing the block it wraps under `name`"""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def observe(name, seconds):
+    """Record one duration for a span name"""
+    if not _enabled:
+        return
+    with _lock:
+        stats = _spans.get(name)
+        if stats is None:
+            stats = _spans[name] = [0, 0.0, 0.0] + [0] * len(SPAN_BUCKETS)
+        stats[0] += 1
+        stats[1] += seconds
+        if seconds > stats[2]:
+            stats[2] = seconds
+        bucket = bisect_left(SPAN_BUCKETS, seconds)
+        if bucket < len(SPAN_BUCKETS):
+            stats[3 + bucket] += 1
+
+
+def incr(name, value=1):
+    """Add to a counter"""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def register_gauge(name, read):
+    """Report `read()` as a gauge at every flush (registration is free when off)"""
+    _gauges[name] = read
+
+
+def snapshot():
+    """Current counters, span summaries and gauges as plain dicts"""
+    with _lock:
+        counters = dict(_counters)
+        spans = {name: list(stats) for name, stats in _spans.items()}
+    gauges = {}
+    for name, read in list(_gauges.items()):
+        try:
+            gauges[name] = read()
+        except Exception:
+            continue  # A gauge that can't be read right now is left out
+    return counters, spans, gauges
+
+
+def to_prometheus(counters, spans, gauges):
+    """Prometheus text exposition of a snapshot"""
+    lines = []
+    for name in sorted(counters):
+        metric = f"{METRICS_PREFIX}_{name}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {counters[name]}"]
+    for name in sorted(gauges):
+        metric = f"{METRICS_PREFIX}_{name}"
+        lines += [f"# TYPE {metric} gauge", f"{metric} {gauges[name]}"]
+    for name in sorted(spans):
+        count, total, _, *buckets = spans[name]
+        metric = f"{METRICS_PREFIX}_{name}_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, hits in zip(SPAN_BUCKETS, buckets):
+            cumulative += hits
+            lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+        lines += [f'{metric}_bucket{{le="+Inf"}} {count}', f"{metric}_sum {total:.6f}", f"{metric}_count {count}"]
+    return "\n".join(lines) + "\n"
+
+
+def to_json(counters, spans, gauges):
+    """One JSON line for a snapshot (span times in milliseconds)"""
+    return json.dumps({
+        "time": time.time(),
+        "counters": counters,
+        "gauges": gauges,
+        "spans": {name: {"count": s[0], "sum_ms": round(s[1] * 1000, 3),
+                         "mean_ms": round(s[1] / s[0] * 1000, 3) if s[0] else 0.0,
+                         "max_ms": round(s[2] * 1000, 3)}
+                  for name, s in spans.items()},
+    })
+
+
+class _Exporter:
+    """Writes the metrics to a file every `interval` seconds on a daemon thread"""
+
+    def __init__(self, fmt, path, interval):
+        self.fmt = fmt
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+
+    def start(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        counters, spans, gauges = snapshot()
+        try:
+            if self.fmt == "prometheus":
+                # Scrapers must never see a half-written file
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(to_prometheus(counters, spans, gauges))
+                os.replace(tmp_path, self.path)
+            else:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(to_json(counters, spans, gauges) + "\n")
+        except OSError as e:
+            print(f"💾 Metrics export failed: {e} 💾")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(self.interval + 1)
+        self.flush()
+
+
+def configure(fmt, path=None, interval=METRICS_FLUSH_SECONDS):
+    """Turn metrics on ('prometheus' or 'jsonl') or off (None / '')"""
+    global _enabled, _exporter
+    if fmt not in ("", None, "prometheus", "jsonl"):
+        raise ValueError(f"Unknown metrics format: {fmt}")
+    if _exporter is not None:
+        _exporter.stop()
+        _exporter = None
+    _enabled = bool(fmt)
+    if _enabled:
+        if path is None:
+            path = os.path.join(LOG_DIR, "metrics.prom" if fmt == "prometheus" else "metrics.jsonl")
+        _exporter = _Exporter(fmt, path, interval).start()
+
+
+def flush():
+    """Write the metrics out now (no-op when off)"""
+    if _exporter is not None:
+        _exporter.flush()
+
+
+def reset():
+    """Forget every counter and span (gauges stay registered)"""
+    with _lock:
+        _counters.clear()
+        _spans.clear()
+
+
+@atexit.register
+def _shutdown():
+    if _exporter is not None:
+        _exporter.stop()
+
+
+if METRICS_FORMAT:
+    configure(METRICS_FORMAT, METRICS_FILE)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Import an existing memory_bank/ directory into a segment file
+
+Usage: python migrate_memory_bank.py [--source DIR] [--dest FILE]
+
+Memories keep their names and creation times. Names already in the segment
+are skipped unless --overwrite is given, so the import can be re-run.
+Afterwards set DIGITAL_DECAY_STORAGE=segment to use the new store.
+"""
+
+import argparse
+import os
+import sys
+
+from memory_storage import DirectoryStorage
+from segment_store import SegmentStorage
+
+DEFAULT_SOURCE = os.path.join(os.path.dirname(__file__), '../memory_bank')
+
+
+def migrate(source_dir, dest_path, overwrite=False):
+    """Copy every memory from a directory bank into a segment; returns (copied, skipped)"""
+    source = DirectoryStorage(source_dir)
+    dest = SegmentStorage(dest_path, auto_compact=False)
+    copied = skipped = 0
+    try:
+        for name, _, created in sorted(source.scan()):
+            if dest.exists(name) and not overwrite:
+                skipped += 1
+                continue
+            dest.write(name, source.read(name), created)
+            copied += 1
+    finally:
+        dest.close()
+    return copied, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a memory_bank/ directory into a segment file")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="memory bank directory")
+    parser.add_argument("--dest", default=None,
+                        help="segment file (default: memory_bank.seg inside the source directory)")
+    parser.add_argument("--overwrite", action="store_true", help="replace memories already in the segment")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.source):
+        print(f"💾 No memory bank at {args.source}")
+        return 1
+    dest = args.dest or os.path.join(args.source, "memory_bank.seg")
+
+    print(f"💾 Migrating {args.source} -> {dest}")
+    copied, skipped = migrate(args.source, dest, overwrite=args.overwrite)
+    print(f"💾 Imported {copied} memories ({skipped} already present)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,14 @@
-import subprocess
 import os
-import time
-import random
-from datetime import datetime
-from memory_utils import (
-    store_memory_block, 
-    load_memories_with_priority,  # Updated to use prioritized loading
-    simulate_memory_decay, 
-    age_memories_over_time
-)
-
-LOG_FILE = os.path.join(os.path.dirname(__file__), '../logs/full_log.txt')
+from conversation_engine import ConversationEngine
+from llm_backends import create_backend
+
+# Conversation log: 'text' is the readable transcript, 'jsonl' replays fast
+# (conversation_log.replay, or load_harness.py --transcript). Writes are
+# buffered and rotated; see conversation_log.py for the flush/fsync settings.
+LOG_FORMAT = os.environ.get("DIGITAL_DECAY_LOG_FORMAT", "text")
+LOG_FILE = os.path.join(os.path.dirname(__file__),
+                        '../logs/full_log.txt' if LOG_FORMAT == "text" else '../logs/full_log.jsonl')
+TURN_STATS_FILE = os.path.join(os.path.dirname(__file__), '../logs/turn_stats.jsonl')
 os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
 
 # ============================================================================
@@ -18,63 +16,112 @@ os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
 # ============================================================================
 DECAY_SIMULATION_INTERVAL = 10  # Run decay simulation every 10 interactions
 AGE_SIMULATION_INTERVAL = 30    # Run age simulation every 30 interactions
+DECAY_CADENCE_UNIT = "turns"    # Or "seconds" to count the intervals in wall-clock time
 
 # ============================================================================
 # END ARTISTIC SIMULATION CONFIGURATION
 # ============================================================================
 
-def ollama_respond(prompt):
-    cmd = ["ollama", "run", "llama3"]
-    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    output, _ = proc.communicate(prompt)
-    return output.strip()
-
-# Track interaction count for simulation timing
-interaction_count = 0
-
-print("🧠 DIGITAL DECAY: REPL MODE (type 'exit' to quit)")
-print("💾 Artistic floppy disk simulation active")
-print("💾 Core identity memories will be preserved")
-print("💾 Regular memories will decay and corrupt over time")
-print("=" * 60)
-
-while True:
-    user_input = input("You: ")
-    if user_input.strip().lower() in ["exit", "quit"]:
-        break
-
-    interaction_count += 1
-
-    # ============================================================================
-    # ARTISTIC SIMULATION TRIGGERS - REMOVE FOR REAL HARDWARE
-    # ============================================================================
-    
-    # Periodic memory decay simulation (only affects regular memories)
-    if interaction_count % DECAY_SIMULATION_INTERVAL == 0:
+# Model backend: 'auto' talks to the local ollama server over a kept-alive
+# connection and falls back to spawning `ollama run` if the server is down.
+MODEL_BACKEND = os.environ.get("DIGITAL_DECAY_BACKEND", "auto")
+MODEL_NAME = os.environ.get("DIGITAL_DECAY_MODEL", "llama3")
+MODEL_HOST = os.environ.get("OLLAMA_HOST_URL", "http://localhost:11434")
+STREAM_OUTPUT = os.environ.get("DIGITAL_DECAY_STREAM", "1") != "0"  # Print tokens as they arrive
+
+# Prompt size limit (estimated tokens): a fixed core-identity prefix, then as
+# many memories as fit, then the user's turn
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("DIGITAL_DECAY_CONTEXT_TOKENS", 2048))
+
+# Load the next turn's context while waiting for the user to type
+PREFETCH_CONTEXT = os.environ.get("DIGITAL_DECAY_PREFETCH", "1") != "0"
+
+# ============================================================================
+# ARTISTIC SIMULATION SCHEDULER - REMOVE FOR REAL HARDWARE
+# ============================================================================
+
+def report_decay(report, random_due, age_due):
+    if random_due:
         print("\n💾 *simulating memory decay* 💾")
-        simulate_memory_decay()
-    
-    # Periodic age-based corruption simulation (only affects regular memories)
-    if interaction_count % AGE_SIMULATION_INTERVAL == 0:
+    if age_due:
         print("\n💾 *simulating age-based corruption* 💾")
-        age_memories_over_time()
-    
-    # ============================================================================
-    # END ARTISTIC SIMULATION TRIGGERS
-    # ============================================================================
+    print(f"💾 {report} 💾")
+
+# ============================================================================
+# END ARTISTIC SIMULATION SCHEDULER
+# ============================================================================
+
+def create_engine(backend):
+    """The REPL's engine: decay on a background worker, logs under logs/"""
+    return ConversationEngine(
+        backend,
+        token_budget=CONTEXT_TOKEN_BUDGET,
+        decay_every=DECAY_SIMULATION_INTERVAL,
+        age_every=AGE_SIMULATION_INTERVAL,
+        decay_unit=DECAY_CADENCE_UNIT,
+        on_decay=report_decay,
+        prefetch=PREFETCH_CONTEXT,
+        log_file=LOG_FILE,
+        log_format=LOG_FORMAT,
+        stats_file=TURN_STATS_FILE,
+    )
+
+def run_turn(engine, user_input):
+    started = []
+
+    def print_token(piece):
+        # "AI:" goes out with the first piece, after the context's read sound
+        if not started:
+            started.append(True)
+            print("AI: ", end="", flush=True)
+        print(piece, end="", flush=True)
+
+    def print_reply(reply, stats, plan):
+        if STREAM_OUTPUT:
+            print("\n")
+        else:
+            print(f"AI: {reply}\n")
+        print_timing(stats, plan)
+
+    engine.step(user_input, on_token=print_token if STREAM_OUTPUT else None, on_reply=print_reply)
+
+def print_timing(stats, plan):
+    timing = f"⏱️  first token {stats.ttft:.2f}s | {stats.tokens_per_sec:.1f} tok/s"
+    if stats.prompt_eval_ms is not None:
+        # Tokens evaluated vs. prompt size shows how much of the prefix was reused
+        evaluated = f"{stats.prompt_tokens} of ~{plan.total_tokens}" if stats.prompt_tokens is not None else f"~{plan.total_tokens}"
+        timing += f" | prompt eval {stats.prompt_eval_ms:.0f} ms ({evaluated} tokens)"
+    print(timing)
+
+def main():
+    backend = create_backend(MODEL_BACKEND, model=MODEL_NAME, host=MODEL_HOST)
+    backend.warm_up()
+    engine = create_engine(backend).start()
 
-    # Use prioritized memory loading (preserves core identity)
-    memory_context = load_memories_with_priority()
-    full_prompt = f"{memory_context}\nUser: {user_input}\nAI:"
-    reply = ollama_respond(full_prompt)
+    print("🧠 DIGITAL DECAY: REPL MODE (type 'exit' to quit)")
+    print("💾 Artistic floppy disk simulation active")
+    print("💾 Core identity memories will be preserved")
+    print("💾 Regular memories will decay and corrupt over time")
+    print("=" * 60)
 
-    print(f"AI: {reply}\n")
+    try:
+        while True:
+            try:
+                user_input = input("You: ")
+            except EOFError:
+                break
+            if user_input.strip().lower() in ["exit", "quit"]:
+                break
 
-    log_entry = f"[{datetime.now()}]\nUser: {user_input}\nAI: {reply}\n\n"
-    with open(LOG_FILE, 'a', encoding='utf-8') as log:
-        log.write(log_entry)
+            run_turn(engine, user_input)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close()
+        backend.close()
 
-    store_memory_block(f"User: {user_input}\nAI: {reply}")
+    print("\n💾 Shutting down digital decay system...")
+    print("💾 Core memories preserved for next session")
 
-print("\n💾 Shutting down digital decay system...")
-print("💾 Core memories preserved for next session")
+if __name__ == "__main__":
+    main()
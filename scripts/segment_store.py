@@ -0,0 +1,255 @@
+"""
+Log-structured memory store - all memories in one append-only segment file
+
+Layout: a file header followed by records. Each record is
+
+    <4s magic><B flags><H name_len><I capacity><I length><d created> name payload
+
+where `capacity` bytes are reserved for the payload and the first `length`
+of them are live. Writing a memory appends a record; deleting one appends a
+tombstone. Decay only ever shrinks a memory, so it rewrites the payload and
+length of the existing record in place. The offset index is rebuilt by
+replaying the file on open, and compaction copies the live records into a
+fresh segment once enough of the file is dead space: superseded records,
+tombstones and the slack decay leaves behind in shrunk records.
+"""
+
+import os
+import struct
+import threading
+import time
+
+from memory_index import parse_memory_timestamp
+
+SEGMENT_MAGIC = b"DDSEG001"
+RECORD_MAGIC = b"DDMR"
+RECORD_HEADER = struct.Struct("<4sBHIId")
+FLAG_TOMBSTONE = 0x01
+
+# Compact when at least this share of the file is dead, and the file is big
+# enough for it to matter
+COMPACT_DEAD_RATIO = 0.5
+COMPACT_MIN_BYTES = 64 * 1024
+
+
+class SegmentCorrupted(Exception):
+    """Raised when a segment file can't be replayed"""
+
+
+class _Record:
+    __slots__ = ("offset", "name_len", "capacity", "length", "created")
+
+    def __init__(self, offset, name_len, capacity, length, created):
+        self.offset = offset
+        self.name_len = name_len
+        self.capacity = capacity
+        self.length = length
+        self.created = created
+
+    @property
+    def payload_offset(self):
+        return self.offset + RECORD_HEADER.size + self.name_len
+
+    @property
+    def size(self):
+        return RECORD_HEADER.size + self.name_len + self.capacity
+
+    @property
+    def slack(self):
+        """Reserved payload bytes decay has freed (already counted as dead)"""
+        return self.capacity - self.length
+
+
+class SegmentStorage:
+    """Append-only segment file with an in-memory offset index"""
+
+    kind = "segment"
+
+    def __init__(self, path, auto_compact=True):
+        self.path = path
+        self.auto_compact = auto_compact
+        self._lock = threading.RLock()
+        self._records = {}       # name -> _Record
+        self._dead_bytes = 0
+        self._compactor = None
+        self._open()
+
+    # ------------------------------------------------------------------
+    # Opening and replay
+    # ------------------------------------------------------------------
+
+    def _open(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._end = os.fstat(self._fd).st_size
+        if self._end == 0:
+            os.pwrite(self._fd, SEGMENT_MAGIC, 0)
+            self._end = len(SEGMENT_MAGIC)
+        elif os.pread(self._fd, len(SEGMENT_MAGIC), 0) != SEGMENT_MAGIC:
+            raise SegmentCorrupted(f"{self.path} is not a memory segment file")
+        self._replay()
+
+    def _replay(self):
+        """Rebuild the offset index from the records on disk"""
+        self._records = {}
+        self._dead_bytes = 0
+        offset = len(SEGMENT_MAGIC)
+        data = os.pread(self._fd, self._end - offset, offset)
+        pos = 0
+        while pos + RECORD_HEADER.size <= len(data):
+            magic, flags, name_len, capacity, length, created = RECORD_HEADER.unpack_from(data, pos)
+            record_size = RECORD_HEADER.size + name_len + capacity
+            if magic != RECORD_MAGIC or pos + record_size > len(data):
+                break  # Torn tail from an interrupted append
+            name = data[pos + RECORD_HEADER.size:pos + RECORD_HEADER.size + name_len].decode("utf-8")
+            previous = self._records.pop(name, None)
+            if previous is not None:
+                self._dead_bytes += previous.size - previous.slack
+            if flags & FLAG_TOMBSTONE:
+                self._dead_bytes += record_size
+            else:
+                self._records[name] = _Record(offset + pos, name_len, capacity, length, created)
+                self._dead_bytes += capacity - length
+            pos += record_size
+        if offset + pos < self._end:
+            # Drop a torn tail so the next append starts on a record boundary
+            os.ftruncate(self._fd, offset + pos)
+            self._end = offset + pos
+
+    # ------------------------------------------------------------------
+    # Storage interface
+    # ------------------------------------------------------------------
+
+    def scan(self):
+        with self._lock:
+            items = [(name, rec.length, rec.created) for name, rec in self._records.items()]
+        return iter(items)
+
+    def exists(self, name):
+        with self._lock:
+            return name in self._records
+
+    def read(self, name):
+        with self._lock:
+            rec = self._records.get(name)
+            if rec is None:
+                raise FileNotFoundError(name)
+            return os.pread(self._fd, rec.length, rec.payload_offset)
+
+    def _append(self, name, data, flags, created):
+        encoded = name.encode("utf-8")
+        header = RECORD_HEADER.pack(RECORD_MAGIC, flags, len(encoded), len(data), len(data), created)
+        offset = self._end
+        os.pwrite(self._fd, header + encoded + data, offset)
+        self._end += len(header) + len(encoded) + len(data)
+        return offset
+
+    def write(self, name, data, created=None):
+        if created is None:
+            created = parse_memory_timestamp(name)
+            if created is None:
+                created = time.time()
+        with self._lock:
+            previous = self._records.get(name)
+            if previous is not None:
+                self._dead_bytes += previous.size - previous.slack
+            offset = self._append(name, data, 0, created)
+            self._records[name] = _Record(offset, len(name.encode("utf-8")), len(data), len(data), created)
+        self._maybe_compact()
+
+    def rewrite(self, name, data):
+        """Decay in place: shrink the record's payload without appending"""
+        with self._lock:
+            rec = self._records.get(name)
+            if rec is None:
+                raise FileNotFoundError(name)
+            if len(data) > rec.capacity:
+                # Not a shrink, so it can't go in place
+                self.write(name, data, rec.created)
+                return
+            # Payload first, then the length field, so a crash in between
+            # leaves the old length over still-valid bytes at worst
+            os.pwrite(self._fd, data, rec.payload_offset)
+            os.pwrite(self._fd, RECORD_HEADER.pack(RECORD_MAGIC, 0, rec.name_len, rec.capacity,
+                                                   len(data), rec.created), rec.offset)
+            self._dead_bytes += rec.length - len(data)
+            rec.length = len(data)
+        self._maybe_compact()
+
+    def delete(self, name):
+        with self._lock:
+            rec = self._records.pop(name, None)
+            if rec is None:
+                raise FileNotFoundError(name)
+            self._dead_bytes += rec.size - rec.slack
+            before = self._end
+            self._append(name, b"", FLAG_TOMBSTONE, rec.created)
+            self._dead_bytes += self._end - before
+        self._maybe_compact()
+
+    def describe(self, name):
+        return f"{self.path}:{name}"
+
+    def close(self):
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    @property
+    def dead_ratio(self):
+        return self._dead_bytes / self._end if self._end else 0.0
+
+    def _maybe_compact(self):
+        if not self.auto_compact or self._end < COMPACT_MIN_BYTES or self.dead_ratio < COMPACT_DEAD_RATIO:
+            return
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, name="segment-compactor", daemon=True)
+        self._compactor.start()
+
+    def compact(self):
+        """Copy live records to a fresh segment and swap it in
+
+        Decay slack is dropped too: each record's capacity shrinks to its
+        current length. Holds the store lock for the copy, which is short at
+        floppy scale; readers of memory_utils don't hold this lock between
+        operations, so a turn waits at most for one compaction.
+        """
+        with self._lock:
+            if self._fd is None:
+                return
+            tmp_path = f"{self.path}.compact"
+            fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                chunks = [SEGMENT_MAGIC]
+                offset = len(SEGMENT_MAGIC)
+                records = {}
+                for name, rec in self._records.items():
+                    encoded = name.encode("utf-8")
+                    payload = os.pread(self._fd, rec.length, rec.payload_offset)
+                    header = RECORD_HEADER.pack(RECORD_MAGIC, 0, len(encoded), len(payload),
+                                                len(payload), rec.created)
+                    chunks.append(header + encoded + payload)
+                    records[name] = _Record(offset, len(encoded), len(payload), len(payload), rec.created)
+                    offset += len(header) + len(encoded) + len(payload)
+                os.pwrite(fd, b"".join(chunks), 0)
+                os.fsync(fd)
+            except BaseException:
+                os.close(fd)
+                os.remove(tmp_path)
+                raise
+            os.replace(tmp_path, self.path)
+            os.close(self._fd)
+            self._fd = fd
+            self._records = records
+            self._end = offset
+            self._dead_bytes = 0
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Session server - many visitor terminals, one memory bank
+
+Usage: python session_server.py [--port 7777] [--model-workers 2] [--queue 16] [--log PATH] [--stub]
+
+Serves conversations over TCP, one UTF-8 line per turn (`nc localhost 7777`
+is enough of a terminal). Every session talks to the same memory bank: all
+memories land in it and every session draws its context from it, with
+memory_utils' bank lock keeping stores, evictions and decay write-backs
+from colliding with each other or with context loads.
+
+Turns go through a bounded queue to a fixed number of model workers, so
+the model backend never sees more than --model-workers turns at once; when
+the queue is full a turn is turned away with a busy message instead of
+piling up. One decay scheduler counts the turns of all sessions.
+
+Besides conversation lines a session understands `:stats` (its own
+metrics as JSON), `:server` (the server's) and `exit`.
+
+Turns are logged to the same file as run_llm.py's (DIGITAL_DECAY_LOG_FORMAT
+picks the format), through one buffered log shared by all sessions.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from conversation_engine import ConversationEngine
+from conversation_log import ConversationLog
+from decay_scheduler import DecayScheduler
+from llm_backends import create_backend
+from load_harness import percentile
+from run_llm import LOG_FILE, LOG_FORMAT
+
+DEFAULT_PORT = 7777
+LATENCY_WINDOW = 1000       # Recent turns kept per session for percentiles
+
+
+@dataclass
+class SessionMetrics:
+    """Counters and recent latencies of one session"""
+    session_id: int
+    started: float = field(default_factory=time.time)
+    turns: int = 0
+    rejected: int = 0           # Turned away because the queue was full
+    errors: int = 0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+    queue_waits: deque = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def to_dict(self):
+        return {
+            "session": self.session_id,
+            "turns": self.turns,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "latency_p50_ms": round(percentile(self.latencies, 50) * 1000, 2),
+            "latency_p99_ms": round(percentile(self.latencies, 99) * 1000, 2),
+            "queue_wait_p50_ms": round(percentile(self.queue_waits, 50) * 1000, 2),
+            "queue_wait_p99_ms": round(percentile(self.queue_waits, 99) * 1000, 2),
+            "uptime_s": round(time.time() - self.started, 1),
+        }
+
+
+class Session:
+    def __init__(self, session_id, backend, token_budget, log):
+        self.metrics = SessionMetrics(session_id)
+        # Decay is counted server-wide; other sessions change the bank all
+        # the time, so a prefetched context would rarely still be current
+        self.engine = ConversationEngine(backend, token_budget=token_budget, decay_every=0, age_every=0,
+                                         prefetch=False, log_file=log)
+
+
+class SessionServer:
+    """asyncio TCP server running sessions' turns on a bounded pool of model workers"""
+
+    def __init__(self, backend, model_workers=2, queue_size=16, token_budget=2048,
+                 decay_every=10, age_every=30, log_file=None, log_format="text"):
+        self.backend = backend
+        self.model_workers = model_workers
+        self.queue_size = queue_size
+        self.token_budget = token_budget
+        # One buffered log for all sessions, so their turns interleave whole
+        self.log = ConversationLog(log_file, fmt=log_format) if log_file else None
+        self.sessions = {}
+        self.total_sessions = 0
+        self.turns = 0
+        self.rejected = 0
+        self._ids = itertools.count(1)
+        self._queue = None
+        self._executor = ThreadPoolExecutor(max_workers=model_workers, thread_name_prefix="model-worker")
+        self.decay_scheduler = None
+        if decay_every or age_every:
+            self.decay_scheduler = DecayScheduler(random_every=decay_every, age_every=age_every,
+                                                  on_report=self._report_decay)
+
+    @staticmethod
+    def _report_decay(report, random_due, age_due):
+        print(f"💾 {report} 💾")
+
+    def metrics(self):
+        return {
+            "sessions_active": len(self.sessions),
+            "sessions_total": self.total_sessions,
+            "turns": self.turns,
+            "rejected": self.rejected,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_size": self.queue_size,
+            "model_workers": self.model_workers,
+            "decay_sweeps": self.decay_scheduler.sweeps if self.decay_scheduler else 0,
+        }
+
+    async def _model_worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            session, text, enqueued, done = await self._queue.get()
+            session.metrics.queue_waits.append(time.perf_counter() - enqueued)
+            try:
+                result = await loop.run_in_executor(self._executor, session.engine.step, text)
+            except Exception as e:
+                if not done.cancelled():
+                    done.set_exception(e)
+            else:
+                if not done.cancelled():
+                    done.set_result(result)
+            finally:
+                self._queue.task_done()
+
+    async def _turn(self, session, text):
+        """Queue one turn and wait for it; returns the reply line to send"""
+        done = asyncio.get_running_loop().create_future()
+        enqueued = time.perf_counter()
+        try:
+            self._queue.put_nowait((session, text, enqueued, done))
+        except asyncio.QueueFull:
+            session.metrics.rejected += 1
+            self.rejected += 1
+            return "💾 *drive busy* too many visitors right now, try again in a moment"
+        try:
+            result = await done
+        except Exception as e:
+            session.metrics.errors += 1
+            return f"💾 *error beep* {e}"
+        session.metrics.turns += 1
+        session.metrics.latencies.append(time.perf_counter() - enqueued)
+        self.turns += 1
+        if self.decay_scheduler is not None:
+            self.decay_scheduler.notify_turn()
+        return f"AI: {result.reply}"
+
+    async def _handle(self, reader, writer):
+        session = Session(next(self._ids), self.backend, self.token_budget, self.log)
+        self.sessions[session.metrics.session_id] = session
+        self.total_sessions += 1
+
+        async def send(line):
+            writer.write((line + "\n").encode("utf-8"))
+            await writer.drain()
+
+        try:
+            await send(f"🧠 DIGITAL DECAY (session {session.metrics.session_id}) - type 'exit' to leave")
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                text = raw.decode("utf-8", errors="replace").strip()
+                if not text:
+                    continue
+                if text.lower() in ("exit", "quit"):
+                    break
+                if text == ":stats":
+                    await send(json.dumps(session.metrics.to_dict()))
+                elif text == ":server":
+                    await send(json.dumps(self.metrics()))
+                else:
+                    await send(await self._turn(session, text))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.sessions.pop(session.metrics.session_id, None)
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT, ready=None):
+        """Serve until cancelled; `ready(port)` is called once listening"""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        workers = [asyncio.create_task(self._model_worker()) for _ in range(self.model_workers)]
+        if self.decay_scheduler is not None:
+            self.decay_scheduler.start()
+        server = await asyncio.start_server(self._handle, host, port)
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[1])
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            if self.decay_scheduler is not None:
+                self.decay_scheduler.stop()
+            self._executor.shutdown(wait=True)
+            if self.log is not None:
+                self.log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Digital Decay to many terminals at once")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--model-workers", type=int, default=2, help="turns sent to the model at once")
+    parser.add_argument("--queue", type=int, default=16, help="turns allowed to wait for a model worker")
+    parser.add_argument("--log", default=LOG_FILE, help="conversation log ('' to log nothing)")
+    parser.add_argument("--log-format", choices=("text", "jsonl"), default=LOG_FORMAT)
+    parser.add_argument("--stub", action="store_true", help="answer with the stub model server")
+    args = parser.parse_args()
+
+    if args.stub:
+        from stub_model_server import start_stub_server
+        _, host = start_stub_server()
+        backend = create_backend("http", host=host, pool_size=args.model_workers)
+    else:
+        backend = create_backend(os.environ.get("DIGITAL_DECAY_BACKEND", "auto"),
+                                 model=os.environ.get("DIGITAL_DECAY_MODEL", "llama3"),
+                                 host=os.environ.get("OLLAMA_HOST_URL", "http://localhost:11434"),
+                                 pool_size=args.model_workers)
+    backend.warm_up()
+
+    server = SessionServer(backend, model_workers=args.model_workers, queue_size=args.queue,
+                           token_budget=int(os.environ.get("DIGITAL_DECAY_CONTEXT_TOKENS", 2048)),
+                           log_file=args.log or None, log_format=args.log_format)
+    try:
+        asyncio.run(server.serve(args.host, args.port,
+                                 ready=lambda port: print(f"🧠 Session server listening on {args.host}:{port}")))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        backend.close()
+    print(f"💾 {json.dumps(server.metrics())}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+Clocks for the memory layer - ARTISTIC SIMULATION
+
+memory_utils reads the time through a clock object: when a memory was
+created (its name carries the timestamp) and how old it is when age decay
+looks at it. The installation runs on SystemClock; simulations swap in a
+VirtualClock (memory_utils.use_clock) and advance it in bulk, so a year of
+aging takes no real time.
+"""
+
+import threading
+import time
+
+DAY = 24 * 3600
+
+
+class SystemClock:
+    """Wall-clock time"""
+
+    def now(self):
+        """Seconds since the epoch"""
+        return time.time()
+
+
+class VirtualClock:
+    """Time that only moves when told to"""
+
+    def __init__(self, start=None):
+        self._now = float(time.time() if start is None else start)
+        self._lock = threading.Lock()
+
+    def now(self):
+        return self._now
+
+    def advance(self, seconds):
+        """Move time forward; returns the new time"""
+        if seconds < 0:
+            raise ValueError("a virtual clock can't go backwards")
+        with self._lock:
+            self._now += seconds
+            return self._now
+
+    def advance_days(self, days):
+        return self.advance(days * DAY)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Installation simulator - a year of memory decay in seconds (ARTISTIC SIMULATION)
+
+Usage: python simulate_installation.py [--days 365] [--memories 10000]
+                                       [--turns-per-day 20] [--seed 0]
+
+Fills a scratch memory bank, then runs the installation's life on a
+virtual clock: each simulated day brings new conversations and decay
+sweeps, and memories age against virtual time instead of waiting for the
+calendar. Nothing sleeps and every random choice is seeded, so the same
+arguments give the same bank; the closing digest makes that easy to check.
+Prints a line per simulated month.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime
+
+from synthetic_turns import conversation
+
+
+def bank_digest(index, manifest):
+    """CRC over every memory's name, length and content CRC (from the manifest)"""
+    digest = 0
+    for name in sorted(index.names()):
+        entry = manifest.get(name)
+        record = f"{name}:{entry.length}:{entry.crc}" if entry else name
+        digest = zlib.crc32(record.encode("utf-8"), digest)
+    return digest
+
+
+def bank_summary(mu):
+    index = mu.get_memory_index()
+    manifest = mu.get_manifest()
+    regular = index.names('regular')
+    integrity = sum(manifest.integrity(n) for n in regular) / len(regular) if regular else 1.0
+    intact = sum(1 for n in regular if (manifest.get(n) is None or manifest.get(n).intact))
+    return len(regular), index.total_bytes, integrity, intact
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the installation's life on a virtual clock")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--memories", type=int, default=10000, help="memories in the bank at the start")
+    parser.add_argument("--turns-per-day", type=int, default=20, help="new conversations per simulated day")
+    parser.add_argument("--random-every-days", type=float, default=1.0, help="days between random decay sweeps")
+    parser.add_argument("--age-every-days", type=float, default=1.0, help="days between age decay passes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", default="2025-01-01", help="virtual start date (YYYY-MM-DD)")
+    parser.add_argument("--quota-bytes", type=int, default=64 * 1024 * 1024,
+                        help="bank quota (default leaves room for the whole run)")
+    parser.add_argument("--storage", default="segment", choices=["directory", "segment", "fat12"],
+                        help="storage backend (segment: no per-file syscalls, fastest)")
+    parser.add_argument("--memory-dir", default=None, help="bank to use (default: a scratch directory)")
+    args = parser.parse_args()
+
+    scratch = None
+    if args.memory_dir is None:
+        scratch = args.memory_dir = tempfile.mkdtemp(prefix="dd_sim_")
+    # memory_utils reads these when first imported
+    os.environ["DIGITAL_DECAY_MEMORY_DIR"] = args.memory_dir
+    os.environ["DIGITAL_DECAY_QUIET"] = "1"
+    os.environ["DIGITAL_DECAY_STORAGE"] = args.storage
+    os.environ["DIGITAL_DECAY_QUOTA_BYTES"] = str(args.quota_bytes)
+    import memory_utils as mu
+    from sim_clock import DAY, VirtualClock
+
+    clock = VirtualClock(datetime.strptime(args.start, "%Y-%m-%d").timestamp())
+    mu.use_clock(clock)
+    mu.set_decay_seed(args.seed)
+    mu.set_context_seed(args.seed)
+    rng = random.Random(args.seed)
+
+    started = time.perf_counter()
+    try:
+        # The opening bank: memories a few seconds apart on the first day
+        for i in range(args.memories):
+            mu.store_memory_block(conversation(rng, i))
+            clock.advance(3)
+        count, used, integrity, intact = bank_summary(mu)
+        print(f"💾 Day 0: {count} memories, {used / 1024:.0f} KB "
+              f"(filled in {time.perf_counter() - started:.1f}s)")
+
+        turn_gap = DAY / args.turns_per_day if args.turns_per_day else DAY
+        next_random = args.random_every_days * DAY
+        next_age = args.age_every_days * DAY
+        elapsed = 0.0
+        stored = args.memories
+        decayed = 0
+        bytes_lost = 0
+        for day in range(1, args.days + 1):
+            for _ in range(max(args.turns_per_day, 1)):
+                clock.advance(turn_gap)
+                elapsed += turn_gap
+                if args.turns_per_day:
+                    mu.store_memory_block(conversation(rng, stored))
+                    stored += 1
+                random_due = args.random_every_days > 0 and elapsed >= next_random
+                age_due = args.age_every_days > 0 and elapsed >= next_age
+                if random_due or age_due:
+                    report = mu.decay_sweep(random_decay=random_due, age_decay=age_due)
+                    decayed += report.files_corrupted
+                    bytes_lost += report.bytes_removed
+                    if random_due:
+                        next_random += args.random_every_days * DAY
+                    if age_due:
+                        next_age += args.age_every_days * DAY
+
+            if day % 30 == 0 or day == args.days:
+                count, used, integrity, intact = bank_summary(mu)
+                print(f"💾 Day {day}: {count} memories, {used / 1024:.0f} KB, "
+                      f"{intact} intact, mean integrity {integrity:.1%}, "
+                      f"{decayed} decay hits, {bytes_lost / 1024:.0f} KB lost "
+                      f"[{time.perf_counter() - started:.1f}s]")
+
+        digest = bank_digest(mu.get_memory_index(), mu.get_manifest())
+        print(f"💾 {args.days} days simulated in {time.perf_counter() - started:.1f}s, "
+              f"bank digest {digest:08x}")
+    finally:
+        mu.get_storage().close()
+        mu.get_manifest().close()
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
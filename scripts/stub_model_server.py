@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Stub model server - stands in for `ollama serve` in tests and demos
+
+Implements just enough of POST /api/generate for the HTTP backend, including
+the newline-delimited JSON streaming mode. The reply echoes the last user
+line so the memory pipeline has something to store.
+
+Like ollama it keeps the previous prompt "evaluated": only the part after
+the prefix shared with the last prompt counts towards prompt_eval_count and
+prompt_eval_duration, so prefix reuse shows up in the reported timings.
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def stub_reply(prompt):
+    """Build a deterministic reply from the last 'User:' line of the prompt"""
+    user_lines = [line for line in prompt.splitlines() if line.startswith("User:")]
+    last = user_lines[-1][len("User:"):].strip() if user_lines else ""
+    return f"I remember you saying '{last}', but my floppy is fading."
+
+
+def shared_prefix_length(a, b):
+    """Length of the common prefix of two strings"""
+    limit = min(len(a), len(b))
+    i = 0
+    while i < limit and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class StubModelHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real server
+    disable_nagle_algorithm = True  # Small streamed writes go out at once, as ollama's do
+    token_delay = 0.0               # Seconds between streamed tokens
+    prompt_eval_ns_per_char = 1000  # Simulated prompt evaluation cost
+    _cached_prompt = ""             # Last evaluated prompt (one slot, like a single KV cache)
+    _cache_lock = threading.Lock()
+
+    @classmethod
+    def _evaluate_prompt(cls, prompt):
+        """Part of the prompt not covered by the cached prefix"""
+        with cls._cache_lock:
+            reused = shared_prefix_length(cls._cached_prompt, prompt)
+            cls._cached_prompt = prompt
+        return prompt[reused:]
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        prompt = payload.get("prompt", "")
+        reply = stub_reply(prompt) if prompt else ""
+        tokens = re.findall(r"\S+\s*", reply)
+        evaluated = self._evaluate_prompt(prompt)
+        final = {
+            "model": payload.get("model", "stub"),
+            "done": True,
+            "prompt_eval_count": len(evaluated.split()),
+            "prompt_eval_duration": self.prompt_eval_ns_per_char * len(evaluated),  # Nanoseconds
+            "eval_count": len(tokens),
+            "eval_duration": int(self.token_delay * 1e9 * len(tokens)),
+        }
+
+        # Like ollama, streaming is the default when the client does not say
+        if prompt and payload.get("stream", True):
+            self._stream(tokens, final)
+            return
+
+        final["response"] = reply
+        body = json.dumps(final).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, tokens, final):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in tokens:
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            self._write_chunk({"response": token, "done": False})
+        final["response"] = ""
+        self._write_chunk(final)
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _write_chunk(self, obj):
+        line = json.dumps(obj).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass  # Keep test output quiet
+
+
+def start_stub_server(host="127.0.0.1", port=0):
+    """Start the stub server on a background thread; returns (server, base_url)"""
+    server = ThreadingHTTPServer((host, port), StubModelHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub model server for Digital Decay")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--token-delay", type=float, default=0.0,
+                        help="seconds between streamed tokens")
+    args = parser.parse_args()
+    StubModelHandler.token_delay = args.token_delay
+
+    server = ThreadingHTTPServer((args.host, args.port), StubModelHandler)
+    print(f"🧪 Stub model server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
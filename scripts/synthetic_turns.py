@@ -0,0 +1,25 @@
+"""
+Synthetic conversation turns for the harnesses and benchmarks
+
+load_harness, simulate_installation, benchmark_memory and
+benchmark_compression all generate their traffic here, so their numbers
+describe the same conversations and stay comparable. Both generators take
+a random.Random, so a seed gives the same turns every run.
+"""
+
+TOPICS = ["floppy disks", "memory", "the weather", "music", "art installations",
+          "old computers", "dreams", "forgetting", "magnetic storage", "identity"]
+
+
+def question(rng, i):
+    """One user line, as typed at the REPL"""
+    return f"What do you remember about {rng.choice(TOPICS)}? (turn {i})"
+
+
+def conversation(rng, i):
+    """One memory in the shape store_memory_block is given: user turn and reply"""
+    topic = rng.choice(TOPICS)
+    other = rng.choice(TOPICS)
+    return (f"User: What do you think about {topic}? I keep coming back to it.\n"
+            f"AI: {topic.capitalize()} reminds me of {other}. I hold on to it for now; "
+            f"this is conversation {i}, and some of it may already be fading.")
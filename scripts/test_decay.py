@@ -2,21 +2,29 @@
 """
 Test script for Digital Decay memory system
 This helps visualize the decay simulation without running the full LLM
+
+Runs on a virtual clock: memories are a minute apart and each decay cycle
+ages them by a day, without waiting for either.
 """
 
 import os
-import time
 import random
-from datetime import datetime
 from memory_utils import (
     store_memory_block, 
     load_random_memories, 
     simulate_memory_decay, 
     age_memories_over_time,
-    simulate_floppy_sounds
+    simulate_floppy_sounds,
+    ensure_initialized,
+    get_memory_index,
+    use_clock
 )
+from sim_clock import VirtualClock
+
+SECONDS_BETWEEN_MEMORIES = 60
+DAYS_PER_CYCLE = 1
 
-def create_test_memories():
+def create_test_memories(clock):
     """Create some test memories to observe decay"""
     print("💾 Creating test memories...")
     
@@ -36,7 +44,7 @@ def create_test_memories():
     for i, conversation in enumerate(test_conversations, 1):
         store_memory_block(conversation)
         print(f"💾 Created memory {i}/10")
-        time.sleep(0.5)  # Simulate real conversation timing
+        clock.advance(SECONDS_BETWEEN_MEMORIES)  # Simulate real conversation timing
 
 def test_decay_simulation():
     """Test the decay simulation functions"""
@@ -57,14 +65,15 @@ def test_decay_simulation():
     print(memories)
     print("-" * 40)
 
-def test_decay_cycle():
+def run_decay_cycles(clock):
     """Test multiple decay cycles"""
     print("\n" + "="*60)
     print("🔄 TESTING DECAY CYCLES")
     print("="*60)
     
     for cycle in range(1, 6):
-        print(f"\n--- Decay Cycle {cycle} ---")
+        clock.advance_days(DAYS_PER_CYCLE)
+        print(f"\n--- Decay Cycle {cycle} (day {cycle * DAYS_PER_CYCLE}) ---")
         
         # Simulate decay
         simulate_memory_decay()
@@ -76,10 +85,8 @@ def test_decay_cycle():
         print("-" * 30)
         print(memories[:200] + "..." if len(memories) > 200 else memories)
         print("-" * 30)
-        
-        time.sleep(1)  # Pause to observe
 
-def show_memory_files():
+def show_memory_files(clock):
     """Show all memory files and their sizes"""
     print("\n" + "="*60)
     print("📁 MEMORY FILES STATUS")
@@ -98,7 +105,9 @@ def show_memory_files():
     for filename in sorted(files):
         filepath = os.path.join(memory_dir, filename)
         size = os.path.getsize(filepath)
-        age_hours = (datetime.now().timestamp() - os.path.getctime(filepath)) / 3600
+        entry = get_memory_index().get(filename)
+        created = entry.created if entry is not None else os.path.getctime(filepath)
+        age_hours = (clock.now() - created) / 3600
         
         # Read first line to show content
         try:
@@ -116,6 +125,11 @@ def main():
     """Main test function"""
     print("🧪 DIGITAL DECAY TEST SUITE")
     print("="*60)
+    clock = VirtualClock()
+    use_clock(clock)
+    
+    # Creates the memory bank (and core memories) on a fresh checkout
+    ensure_initialized()
     
     # Check if we have existing memories
     memory_dir = os.path.join(os.path.dirname(__file__), '../memory_bank')
@@ -123,21 +137,21 @@ def main():
     
     if len(existing_files) < 5:
         print("💾 Creating test memories...")
-        create_test_memories()
+        create_test_memories(clock)
     else:
         print(f"💾 Found {len(existing_files)} existing memories")
     
     # Show initial state
-    show_memory_files()
+    show_memory_files(clock)
     
     # Test decay simulation
     test_decay_simulation()
     
     # Test multiple cycles
-    test_decay_cycle()
+    run_decay_cycles(clock)
     
     # Show final state
-    show_memory_files()
+    show_memory_files(clock)
     
     print("\n✅ Decay test complete!")
     print("💾 You can now run the full system with: python run_llm.py")
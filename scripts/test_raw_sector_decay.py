@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Regression check for raw sector decay of compressed memories
+
+Flipped bits in a compressed memory's header (codec or dictionary id)
+leave nothing the codec can decode. The sweep that flipped them used to
+stop there with a CodecError, leaving the memories it had already damaged
+unrecorded, and every later sweep reaching the memory failed the same way.
+Run directly or with pytest.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_sweeps_survive_a_damaged_compression_header():
+    code = """
+import memory_utils as mu
+from integrity_manifest import crc32
+for i in range(8):
+    mu.store_memory_block(f"User: tell me about memory {i}\\nAI: " + "the floppy hums and remembers. " * 20)
+storage = mu.get_storage()
+names = sorted(mu.get_memory_index().names('regular'))
+# An unknown codec id and a dictionary that doesn't exist
+for name, header in zip(names, (b"\\x00Z!\\x00", b"\\x00Z\\x01\\x07")):
+    blob = storage.read(name)
+    assert blob[:2] == b"\\x00Z", blob[:4]
+    storage.rewrite(name, header + blob[4:])
+mu.RANDOM_DECAY_CHANCE = 1.0
+for _ in range(3):
+    generation = mu.bank_generation()
+    report = mu.decay_sweep(age_decay=False)
+    assert report.files_scanned == len(names)
+    if report.bytes_flipped:
+        assert mu.bank_generation() > generation
+# The manifest follows what is on disk, damaged headers included
+for name in names:
+    stored = storage.read(name)
+    data = mu._decode_damaged(stored)
+    assert mu.get_manifest().get(name).crc == crc32(stored if data is None else data), name
+mu.load_memory_fragments(8)
+"""
+    with tempfile.TemporaryDirectory() as bank:
+        env = dict(os.environ, DIGITAL_DECAY_MEMORY_DIR=bank, DIGITAL_DECAY_STORAGE="fat12",
+                   DIGITAL_DECAY_COMPRESSION="zlib", DIGITAL_DECAY_RAW_SECTORS="1",
+                   DIGITAL_DECAY_QUIET="1")
+        proc = subprocess.run([sys.executable, "-c", code], env=env, cwd=SCRIPTS_DIR,
+                              capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+
+
+if __name__ == "__main__":
+    test_sweeps_survive_a_damaged_compression_header()
+    print("💾 Raw sector decay checks passed")
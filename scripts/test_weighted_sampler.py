@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Regression checks for weighted context sampling with decayed memories
+
+A memory decayed down to nothing has weight 0 in 'integrity' and 'mixed'
+sampling. Drawing every memory that still has weight used to leave a
+rounding residue in the tree total that sent the next draw walking off
+the end of the slots (IndexError). Run directly or with pytest.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from weighted_sampler import WeightedSampler
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_zero_weight_memories_are_never_drawn():
+    weights = [("a", 0.1), ("b", 0.2), ("c", 0.7), ("decayed", 0.0)]
+    for seed in range(200):
+        sampler = WeightedSampler.build(weights)
+        picked = sampler.sample(4, np.random.default_rng(seed))
+        assert sorted(picked) == ["a", "b", "c"], (seed, picked)
+
+
+def test_weights_changed_to_zero_are_skipped():
+    sampler = WeightedSampler.build((f"m{i}", 1.0 / (i + 3)) for i in range(5))
+    sampler.set("m2", 0.0)
+    sampler.remove("m4")
+    sampler.set("m5", 0.0)
+    for seed in range(200):
+        picked = sampler.sample(6, np.random.default_rng(seed))
+        assert sorted(picked) == ["m0", "m1", "m3"], (seed, picked)
+
+
+def test_fragments_with_a_memory_decayed_to_nothing():
+    """The reported case, through memory_utils with integrity sampling"""
+    code = """
+import memory_utils as mu
+for i in range(5):
+    mu.store_memory_block(f"User: memory {i}\\nAI: something to remember, number {i}")
+names = sorted(mu.get_memory_index().names('regular'))
+# One memory decayed to nothing, the rest partly (fractional weights)
+mu._write_decayed(names[0], b"", b"", 0.0)
+for name, survived in zip(names[1:], (0.1, 0.2, 0.7, 0.3)):
+    mu._write_decayed(name, b"x", b"x", survived)
+for seed in range(100):
+    mu.set_context_seed(seed)
+    assert len(mu.load_memory_fragments(5)) == 4
+"""
+    with tempfile.TemporaryDirectory() as bank:
+        env = dict(os.environ, DIGITAL_DECAY_MEMORY_DIR=bank, DIGITAL_DECAY_SAMPLING="integrity",
+                   DIGITAL_DECAY_QUIET="1")
+        proc = subprocess.run([sys.executable, "-c", code], env=env, cwd=SCRIPTS_DIR,
+                              capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+
+
+if __name__ == "__main__":
+    test_zero_weight_memories_are_never_drawn()
+    test_weights_changed_to_zero_are_skipped()
+    test_fragments_with_a_memory_decayed_to_nothing()
+    print("💾 Weighted sampling checks passed")
@@ -0,0 +1,183 @@
+"""
+Weighted sampling of memories without replacement
+
+Weights live in a Fenwick (binary indexed) tree over slots, so changing one
+memory's weight, adding or removing a memory and drawing one memory are all
+O(log n). A draw of k memories without replacement takes each winner's
+weight out of the tree for the rest of the draw and puts it back after, so
+nothing is rebuilt per call. Draws use the caller's generator, so the same
+seed gives the same selections.
+"""
+
+
+class WeightedSampler:
+    """Name -> weight map that can draw names in proportion to their weight"""
+
+    def __init__(self, capacity=64):
+        self._capacity = capacity
+        self._tree = [0.0] * (capacity + 1)   # 1-based Fenwick tree
+        self._weights = [0.0] * capacity
+        self._names = [None] * capacity
+        self._slots = {}
+        self._free = []
+        self._used = 0          # Slots ever handed out (the rest are untouched)
+        self._positive = 0      # Slots with a weight above zero
+        self._updates = 0
+
+    @classmethod
+    def build(cls, weights):
+        """Sampler over an iterable of (name, weight) pairs, built in O(n)"""
+        items = list(weights)
+        capacity = 64
+        while capacity < len(items):
+            capacity *= 2
+        sampler = cls(capacity)
+        for slot, (name, weight) in enumerate(items):
+            sampler._names[slot] = name
+            sampler._weights[slot] = max(float(weight), 0.0)
+            sampler._slots[name] = slot
+        sampler._used = len(items)
+        sampler._positive = sum(1 for weight in sampler._weights if weight > 0.0)
+        sampler._rebuild()
+        return sampler
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, name):
+        return name in self._slots
+
+    def weight(self, name):
+        slot = self._slots.get(name)
+        return self._weights[slot] if slot is not None else 0.0
+
+    def total(self):
+        """Sum of all weights"""
+        return self._prefix(self._capacity)
+
+    def set(self, name, weight):
+        """Add a memory or change its weight"""
+        weight = max(float(weight), 0.0)
+        slot = self._slots.get(name)
+        if slot is None:
+            slot = self._allocate(name)
+        self._positive += (weight > 0.0) - (self._weights[slot] > 0.0)
+        self._add(slot, weight - self._weights[slot])
+        self._weights[slot] = weight
+        self._maybe_rebuild()
+
+    def remove(self, name):
+        """Forget a memory; unknown names are ignored"""
+        slot = self._slots.pop(name, None)
+        if slot is None:
+            return
+        if self._weights[slot] > 0.0:
+            self._positive -= 1
+        self._add(slot, -self._weights[slot])
+        self._weights[slot] = 0.0
+        self._names[slot] = None
+        self._free.append(slot)
+        self._maybe_rebuild()
+
+    def sample(self, k, rng):
+        """Up to k distinct names, drawn in proportion to weight (numpy Generator)"""
+        taken = []
+        try:
+            for _ in range(min(k, self._positive)):
+                # Zero-weight memories are never drawn; the count, not the
+                # tree total, says when only they are left, since taking the
+                # winners out can leave a rounding residue in the total
+                total = self.total()
+                if total <= 0.0:
+                    break
+                slot = self._find(rng.random() * total)
+                taken.append((slot, self._weights[slot]))
+                self._add(slot, -self._weights[slot])
+                self._weights[slot] = 0.0
+        finally:
+            # Put the winners' weights back for the next draw
+            for slot, weight in taken:
+                self._weights[slot] = weight
+                self._add(slot, weight)
+        return [self._names[slot] for slot, _ in taken]
+
+    # ------------------------------------------------------------------
+    # Fenwick tree
+    # ------------------------------------------------------------------
+
+    def _add(self, slot, delta):
+        if not delta:
+            return
+        i = slot + 1
+        tree = self._tree
+        while i <= self._capacity:
+            tree[i] += delta
+            i += i & -i
+        self._updates += 1
+
+    def _maybe_rebuild(self):
+        if self._updates > 8 * self._capacity:
+            # Floating point error accumulates over many updates; start clean
+            self._rebuild()
+
+    def _prefix(self, count):
+        total = 0.0
+        i = count
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _find(self, target):
+        """Slot whose cumulative weight range contains `target`"""
+        pos = 0
+        mask = 1 << (self._capacity.bit_length() - 1)
+        tree = self._tree
+        while mask:
+            nxt = pos + mask
+            if nxt <= self._capacity and tree[nxt] <= target:
+                pos = nxt
+                target -= tree[nxt]
+            mask >>= 1
+        # Rounding can land past the last weighted slot or on an empty one;
+        # take the nearest weighted slot below, else above
+        pos = min(pos, self._used - 1)
+        weights = self._weights
+        for slot in range(pos, -1, -1):
+            if weights[slot] > 0.0:
+                return slot
+        for slot in range(pos + 1, self._used):
+            if weights[slot] > 0.0:
+                return slot
+        raise LookupError("no memory with a positive weight to draw")
+
+    def _allocate(self, name):
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self._used == self._capacity:
+                self._grow()
+            slot = self._used
+            self._used += 1
+        self._names[slot] = name
+        self._slots[name] = slot
+        return slot
+
+    def _grow(self):
+        extra = self._capacity
+        self._capacity *= 2
+        self._weights.extend([0.0] * extra)
+        self._names.extend([None] * extra)
+        self._rebuild()
+
+    def _rebuild(self):
+        """Recompute the tree from the slot weights in O(n)"""
+        tree = [0.0] * (self._capacity + 1)
+        for slot, weight in enumerate(self._weights):
+            i = slot + 1
+            tree[i] += weight
+            parent = i + (i & -i)
+            if parent <= self._capacity:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._updates = 0